@@ -0,0 +1,116 @@
+"""
+Аутентификация по токену с кешем в памяти процесса.
+
+Пары токен -> (пользователь, токен) хранятся в LRU ограниченного размера
+и живут не дольше AUTH_TOKEN_CACHE_TIMEOUT. Каждая запись помнит версию
+пользователя из общего кеша: выход, удаление токена и любое сохранение
+пользователя (в том числе деактивация) удаляют версию, и записи этого
+пользователя перестают читаться во всех процессах.
+"""
+import copy
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.constants import AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TIMEOUT
+from core.versions import delete_versions, get_version
+
+User = get_user_model()
+
+
+def get_user_version_key(user_id):
+    return f'auth:user_version:{user_id}'
+
+
+def get_user_version(user_id):
+    return get_version(get_user_version_key(user_id))
+
+
+def invalidate_user(user_id):
+    delete_versions((get_user_version_key(user_id),))
+
+
+class TokenCache:
+    """Потокобезопасный LRU с временем жизни записей."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] < monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, token, version):
+        with self._lock:
+            self._entries[key] = {
+                'token': token,
+                'version': version,
+                'expires': monotonic() + self.timeout,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TIMEOUT)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к БД для недавно виденных токенов.
+
+    Подключается в REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES']. При
+    нескольких процессах CACHE_BACKEND должен быть общим, иначе выход
+    в одном процессе другие заметят только через время жизни записи.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            token = entry['token']
+            if entry['version'] == get_user_version(token.user_id):
+                return self.copy_credentials(token)
+        token = self.get_token(key)
+        token_cache.set(key, token, get_user_version(token.user_id))
+        return self.copy_credentials(token)
+
+    def get_token(self, key):
+        """
+        Те же проверки, что у TokenAuthentication. Счетчики пользователя
+        в кеше быстро устаревают, поэтому они отложены и читаются заново
+        при обращении.
+        """
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').defer(*(
+                f'user__{field}' for field in User.counter_fields
+            )).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return token
+
+    @staticmethod
+    def copy_credentials(token):
+        """Каждый запрос получает свои копии, а не общие экземпляры."""
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
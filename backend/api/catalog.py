@@ -0,0 +1,84 @@
+from hashlib import sha1
+from threading import Lock
+from time import time
+
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from core.constants import CATALOG_CACHE_MAX_AGE
+from core.versions import delete_versions, get_version, new_version
+from recipes.models import Ingredient, Tag
+
+from .serializers import IngredientSerializer, TagSerializer
+
+
+class Catalog:
+    """
+    Справочник, заранее сериализованный в JSON и хранящийся в памяти.
+
+    Отдает тело с сильным ETag и Last-Modified и отвечает 304 на
+    совпадающий If-None-Match. Версия и время изменения лежат в общем
+    кеше, поэтому сброс в одном процессе видят и остальные.
+    """
+
+    def __init__(self, name, queryset, serializer_class):
+        self.state_key = f'catalog:{name}:state'
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self._lock = Lock()
+        self._entry = None
+
+    def invalidate(self):
+        """
+        Следующее чтение заведет новую версию со временем изменения.
+        Удаление повторяется после фиксации транзакции.
+        """
+        self._entry = None
+        delete_versions((self.state_key,))
+
+    def _load(self):
+        state = get_version(
+            self.state_key,
+            lambda: {'version': new_version(), 'modified': time()}
+        )
+        entry = self._entry
+        if entry is not None and entry['version'] == state['version']:
+            return entry
+        with self._lock:
+            body = JSONRenderer().render(
+                self.serializer_class(self.queryset.all(), many=True).data
+            )
+            entry = {
+                'version': state['version'],
+                'body': body,
+                'etag': f'"{sha1(body).hexdigest()}"',
+                'last_modified': int(state['modified']),
+            }
+            self._entry = entry
+        return entry
+
+    def response(self, request):
+        entry = self._load()
+        response = get_conditional_response(
+            request, etag=entry['etag'], last_modified=entry['last_modified']
+        )
+        if response is None:
+            response = HttpResponse(
+                entry['body'], content_type='application/json'
+            )
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        patch_cache_control(
+            response, public=True, max_age=CATALOG_CACHE_MAX_AGE
+        )
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+tags_catalog = Catalog('tags', Tag.objects.all(), TagSerializer)
+ingredients_catalog = Catalog(
+    'ingredients', Ingredient.objects.all(), IngredientSerializer
+)
@@ -1,6 +1,8 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from recipes.search import search_recipes
 
 
 class IngredientFilter(filters.FilterSet):
@@ -21,27 +23,38 @@ class RecipeFilter(filters.FilterSet):
     tags = filters.CharFilter(
         method='tags_filter'
     )
+    search = filters.CharFilter(
+        method='search_filter'
+    )
 
     class Meta:
         model = Recipe
         fields = ('author',)
 
     def is_in_shopping_cart_filter(self, queryset, name, value):
-        if value and self.request.user.is_authenticated:
-            return queryset.filter(
-                shoppingcart_users__user=self.request.user
-            )
-        return queryset
+        return self.user_recipes_filter(queryset, ShoppingCart, value)
 
     def is_favorited_filter(self, queryset, name, value):
+        return self.user_recipes_filter(queryset, Favorite, value)
+
+    def user_recipes_filter(self, queryset, model, value):
+        """
+        Фильтрует через коррелированный EXISTS, а не JOIN, чтобы фильтры
+        не размножали строки и не требовали DISTINCT.
+        """
         if value and self.request.user.is_authenticated:
-            return queryset.filter(
-                favorite_users__user=self.request.user
-            )
+            return queryset.filter(Exists(model.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk')
+            )))
         return queryset
 
     def tags_filter(self, queryset, name, value):
         tag_slugs = self.request.query_params.getlist('tags')
         if tag_slugs:
-            return queryset.filter(tags__slug__in=tag_slugs).distinct()
+            return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'), tag__slug__in=tag_slugs
+            )))
         return queryset
+
+    def search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
@@ -0,0 +1,71 @@
+from bisect import bisect_left
+from threading import Lock
+
+from core.constants import INGREDIENT_SEARCH_LIMIT
+from core.versions import delete_versions, get_version
+from recipes.models import Ingredient
+
+INDEX_VERSION_KEY = 'ingredient_index:version'
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Хранит отсортированный по нормализованному названию массив и ищет
+    префикс бинарным поиском, а подстроку — линейным проходом. Строится
+    лениво при первом поиске и сбрасывается при изменении ингредиентов,
+    в том числе в других процессах через версию в общем кеше.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+
+    def invalidate(self):
+        self._index = None
+        delete_versions((INDEX_VERSION_KEY,))
+
+    def _load(self):
+        version = get_version(INDEX_VERSION_KEY)
+        index = self._index
+        if index is not None and index[0] == version:
+            return index[1], index[2]
+        with self._lock:
+            rows = sorted(
+                (normalize(name), name, measurement_unit, pk)
+                for pk, name, measurement_unit
+                in Ingredient.objects.order_by().values_list(
+                    'pk', 'name', 'measurement_unit'
+                )
+            )
+            keys = [row[0] for row in rows]
+            items = [
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for _, name, unit, pk in rows
+            ]
+            self._index = (version, keys, items)
+        return keys, items
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        """Возвращает совпадения по префиксу, затем по подстроке."""
+        keys, items = self._load()
+        query = normalize(query)
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        results = items[start:min(end, start + limit)]
+        for position, key in enumerate(keys):
+            if len(results) >= limit:
+                break
+            if query in key and not start <= position < end:
+                results.append(items[position])
+        return results
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,152 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, Tag
+
+User = get_user_model()
+
+FULL_SCAN_MARKERS = {
+    'postgresql': ('Seq Scan',),
+    'sqlite': ('SCAN ',),
+}
+INDEX_MARKERS = (
+    'USING INDEX', 'USING COVERING INDEX', 'USING INTEGER',
+    'VIRTUAL TABLE INDEX'
+)
+# Ответы, которые эндпоинты кладут в кеш, не должны попасть в общий кеш.
+REPLAY_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'explain_queries',
+    }
+}
+
+
+def get_endpoints(user):
+    """Возвращает основные эндпоинты с параметрами из текущих данных."""
+    recipe = (
+        Recipe.objects.filter(author=user).first() or Recipe.objects.first()
+    )
+    tag = Tag.objects.first()
+    author = Recipe.objects.exclude(author=user).values_list(
+        'author', flat=True
+    ).first()
+    favorite = Favorite.objects.filter(user=user).select_related(
+        'recipe'
+    ).first()
+    endpoints = {
+        'recipes-list': '/api/recipes/',
+        'recipes-list-cursor': '/api/recipes/?cursor=',
+        'recipes-list-filters': (
+            f'/api/recipes/?tags={tag.slug if tag else ""}'
+            '&is_favorited=1&is_in_shopping_cart=1'
+        ),
+        'recipes-list-author': f'/api/recipes/?author={author or user.id}',
+        'users-list': '/api/users/',
+        'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+        'feed': '/api/recipes/feed/',
+        'download-shopping-cart': (
+            '/api/recipes/download_shopping_cart/?format=txt'
+        ),
+    }
+    if favorite:
+        endpoints['recipes-search'] = (
+            f'/api/recipes/?search={favorite.recipe.name.split()[0]}'
+        )
+    if recipe:
+        endpoints['recipes-detail'] = f'/api/recipes/{recipe.id}/'
+        endpoints['short-link'] = f'/api/recipes/{recipe.id}/get-link/'
+    return endpoints
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет запросы основных эндпоинтов и печатает EXPLAIN '
+        'каждого SELECT, отмечая полные просмотры таблиц. Каждый запрос '
+        'идет в транзакции, которая затем откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого идут запросы.'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='EXPLAIN ANALYZE на PostgreSQL.'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        client = APIClient()
+        client.force_authenticate(user)
+        full_scans = 0
+        with override_settings(ALLOWED_HOSTS=('*',), CACHES=REPLAY_CACHES):
+            for name, url in get_endpoints(user).items():
+                self.stdout.write(
+                    self.style.MIGRATE_HEADING(f'{name}: {url}')
+                )
+                with transaction.atomic():
+                    full_scans += self.explain_endpoint(
+                        client, url, options['analyze']
+                    )
+                    transaction.set_rollback(True)
+        self.stdout.write(
+            f'Запросов с полным просмотром таблиц: {full_scans}.'
+        )
+
+    def explain_endpoint(self, client, url, analyze):
+        """
+        Печатает планы SELECT одного запроса и возвращает число полных
+        просмотров. Записи запроса, например короткая ссылка или лента,
+        откатываются вызывающим кодом.
+        """
+        full_scans = 0
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            plan = self.explain(sql, analyze)
+            full_scan = self.is_full_scan(plan)
+            full_scans += full_scan
+            self.stdout.write(sql)
+            self.stdout.write(self.style.WARNING(plan) if full_scan else plan)
+            self.stdout.write('')
+        return full_scans
+
+    def get_user(self, email):
+        users = User.objects.order_by('id')
+        user = users.filter(email=email).first() if email else users.first()
+        if user is None:
+            raise CommandError('Пользователь не найден.')
+        return user
+
+    def explain(self, sql, analyze):
+        if connection.vendor == 'postgresql':
+            prefix = 'EXPLAIN ANALYZE ' if analyze else 'EXPLAIN '
+        elif connection.vendor == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        else:
+            prefix = 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            return '\n'.join(
+                ' '.join(str(value) for value in row)
+                for row in cursor.fetchall()
+            )
+
+    def is_full_scan(self, plan):
+        markers = FULL_SCAN_MARKERS.get(connection.vendor, ())
+        return any(
+            marker in line and not any(
+                index in line for index in INDEX_MARKERS
+            )
+            for line in plan.splitlines()
+            for marker in markers
+        )
@@ -0,0 +1,74 @@
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=50',
+    '/api/tags/',
+    '/api/ingredients/?name=сол',
+)
+
+
+def fetch(url):
+    started = perf_counter()
+    try:
+        with urlopen(url) as response:
+            response.read()
+            ok = response.status < 400
+    except (HTTPError, URLError):
+        ok = False
+    return ok, (perf_counter() - started) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер параллельными GET-запросами и выводит '
+        'пропускную способность и задержки. Используется для сравнения '
+        'синхронных воркеров gunicorn и режима ASGI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'base_url', help='Адрес сервера, например http://127.0.0.1:8000'
+        )
+        parser.add_argument(
+            '--paths', nargs='+', default=DEFAULT_PATHS,
+            help='Пути, которые запрашиваются по кругу.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=(1, 8, 32),
+            help='Число одновременных клиентов; можно несколько значений.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=400,
+            help='Число запросов на каждый уровень параллельности.'
+        )
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        paths = options['paths']
+        urls = [
+            base_url + quote(paths[index % len(paths)], safe='/?=&')
+            for index in range(options['requests'])
+        ]
+        fetch(urls[0])
+        for concurrency in options['concurrency']:
+            started = perf_counter()
+            with ThreadPoolExecutor(concurrency) as executor:
+                results = list(executor.map(fetch, urls))
+            elapsed = perf_counter() - started
+            latencies = sorted(latency for _, latency in results)
+            errors = sum(not ok for ok, _ in results)
+            self.stdout.write(
+                f'concurrency={concurrency}: '
+                f'{len(results) / elapsed:.0f} запросов/с, '
+                f'p50={statistics.median(latencies):.1f} мс, '
+                f'p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} мс, '
+                f'ошибок {errors}'
+            )
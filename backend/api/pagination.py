@@ -1,8 +1,179 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from core.constants import PAGINATION_PAGE_SIZE
 
 
+class CountPaginator(Paginator):
+    """
+    Считает строки без аннотаций: EXISTS для is_favorited и подобных
+    полей нужны только на странице, а не для каждой строки в COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        return self.object_list.values('pk').count()
+
+
 class PageNumberPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с необязательным режимом курсора.
+
+    Если у класса задан keyset_ordering, а в запросе передан параметр
+    cursor (пустой для первой страницы), страница выбирается по ключу
+    крайней записи: без COUNT(*) и OFFSET, со стабильными ссылками
+    next/previous. При keyset_only режим курсора включён всегда.
+
+    Параметры из cursor_incompatible_params задают свой порядок строк,
+    который курсор заменил бы на keyset_ordering, поэтому вместе
+    с курсором они отклоняются.
+    """
+    django_paginator_class = CountPaginator
     page_size = PAGINATION_PAGE_SIZE
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+    keyset_ordering = None
+    keyset_only = False
+    cursor_incompatible_params = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = (
+            self.keyset_ordering is not None
+            and (
+                self.keyset_only
+                or self.cursor_query_param in request.query_params
+            )
+        )
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        for param in self.cursor_incompatible_params:
+            if request.query_params.get(param):
+                raise serializers.ValidationError({
+                    self.cursor_query_param: [
+                        f'Курсор нельзя сочетать с параметром {param}.'
+                    ]
+                })
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(queryset.model, request)
+        ordering = self.keyset_ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(ordering, position)
+            )
+        page = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+        self.next_position = self.previous_position = None
+        if page and (has_more if not reverse else True):
+            self.next_position = self.get_position(page[-1])
+        if page and (has_more if reverse else position is not None):
+            self.previous_position = self.get_position(page[0])
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict((
+            ('next', self.encode_cursor(self.next_position, False)),
+            ('previous', self.encode_cursor(self.previous_position, True)),
+            ('results', data),
+        )))
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        if self.keyset_ordering is not None:
+            parameters.append({
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': (
+                    'Курсор страницы; пустое значение включает режим курсора.'
+                ),
+                'schema': {'type': 'string'},
+            })
+        return parameters
+
+    def get_fields(self):
+        return tuple(field.lstrip('-') for field in self.keyset_ordering)
+
+    def get_position(self, item):
+        if isinstance(item, dict):
+            return [item[field] for field in self.get_fields()]
+        return [getattr(item, field) for field in self.get_fields()]
+
+    def get_keyset_filter(self, ordering, position):
+        """Строит условие «строго после position» для порядка ordering."""
+        keyset_filter = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{name}__{lookup}': position[index]})
+            for previous_index, previous in enumerate(ordering[:index]):
+                condition &= Q(
+                    **{previous.lstrip('-'): position[previous_index]}
+                )
+            keyset_filter |= condition
+        return keyset_filter
+
+    def decode_cursor(self, model, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            *values, reverse = json.loads(
+                urlsafe_b64decode(cursor.encode()).decode()
+            )
+            fields = self.get_fields()
+            if len(values) != len(fields):
+                raise ValueError
+            return [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(fields, values)
+            ], bool(reverse)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        if position is None:
+            return None
+        cursor = urlsafe_b64encode(
+            json.dumps([*position, reverse], default=str).encode()
+        ).decode()
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+
+class RecipePagination(PageNumberPagination):
+    keyset_ordering = ('-created_at', '-id')
+    cursor_incompatible_params = ('search',)
+
+
+class SubscriptionPagination(PageNumberPagination):
+    keyset_ordering = ('username', 'id')
+
+
+class FeedPagination(PageNumberPagination):
+    keyset_ordering = ('-created_at', '-recipe_id')
+    keyset_only = True
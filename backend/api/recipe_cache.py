@@ -0,0 +1,72 @@
+"""
+Кеш ответов для анонимных запросов к списку и карточке рецепта.
+
+Ключ содержит версии данных, от которых зависит ответ: общую версию
+(теги и ингредиенты), версию списков и версию каждого рецепта. При
+изменении данных версия удаляется из кеша, следующий запрос заводит
+новую, а старые записи просто перестают читаться и истекают сами.
+"""
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from core.versions import delete_versions, get_versions
+
+SHARED_VERSION_KEY = 'recipes_cache:shared_version'
+LIST_VERSION_KEY = 'recipes_cache:list_version'
+
+
+def get_recipe_version_key(recipe_id):
+    return f'recipes_cache:recipe_version:{recipe_id}'
+
+
+def join_versions(keys):
+    versions = get_versions(keys)
+    return ':'.join(str(versions.get(key)) for key in keys)
+
+
+def get_list_key(request):
+    """Ключ списка: адрес сайта и отсортированные параметры запроса."""
+    query = urlencode(sorted(
+        (name, value)
+        for name in request.GET
+        for value in request.GET.getlist(name)
+    ))
+    location = md5(
+        f'{request.scheme}://{request.get_host()}?{query}'.encode()
+    ).hexdigest()
+    versions = join_versions((SHARED_VERSION_KEY, LIST_VERSION_KEY))
+    return f'recipes_cache:list:{location}:{versions}'
+
+
+def get_detail_key(request, recipe_id):
+    location = md5(
+        f'{request.scheme}://{request.get_host()}'.encode()
+    ).hexdigest()
+    versions = join_versions(
+        (SHARED_VERSION_KEY, get_recipe_version_key(recipe_id))
+    )
+    return f'recipes_cache:detail:{recipe_id}:{location}:{versions}'
+
+
+def json_response(body):
+    """
+    Ответ с телом из кеша. Vary совпадает с тем, что ставит DRF, чтобы
+    промах и попадание, синхронные и асинхронные, не различались.
+    """
+    response = HttpResponse(body, content_type='application/json')
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def invalidate_recipes(recipe_ids):
+    delete_versions((
+        LIST_VERSION_KEY,
+        *(get_recipe_version_key(recipe_id) for recipe_id in recipe_ids)
+    ))
+
+
+def invalidate_all():
+    delete_versions((SHARED_VERSION_KEY,))
@@ -0,0 +1,139 @@
+import csv
+import json
+from functools import lru_cache
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from reportlab.lib import enums, pagesizes, styles
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import (ListFlowable, ListItem, Paragraph,
+                                SimpleDocTemplate)
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+SHOPPING_LIST_TITLE = 'Список покупок'
+
+
+@lru_cache(maxsize=None)
+def get_pdf_styles():
+    """Регистрирует шрифт и собирает стили PDF один раз на процесс."""
+    pdfmetrics.registerFont(
+        TTFont('OpenSans', settings.BASE_DIR / 'fonts/OpenSans-Regular.ttf')
+    )
+    header_style = styles.ParagraphStyle(
+        'HeaderStyle',
+        fontName='OpenSans',
+        fontSize=14,
+        alignment=enums.TA_CENTER,
+        spaceAfter=25
+    )
+    regular_style = styles.ParagraphStyle(
+        'RegularStyle',
+        fontName='OpenSans',
+        fontSize=12,
+        spaceAfter=10
+    )
+    return header_style, regular_style
+
+
+def format_shopping_list_item(item):
+    return (
+        f'{item["name"]} — {item["total_amount"]} '
+        f'{item["measurement_unit"]}'
+    )
+
+
+class FormatContentNegotiation(DefaultContentNegotiation):
+    """Выбирает рендерер только по параметру format, игнорируя Accept."""
+
+    def get_accept_list(self, request):
+        return ['*/*']
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый рендерер списка покупок.
+
+    Ошибки API (словарь вместо списка ингредиентов) отдаются как JSON,
+    чтобы не собирать ради них PDF.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            response = (renderer_context or {}).get('response')
+            if response is not None:
+                response['Content-Type'] = 'application/json'
+            return json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return self.render_shopping_list(data)
+
+    def render_shopping_list(self, items):
+        raise NotImplementedError
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def render_shopping_list(self, items):
+        header_style, regular_style = get_pdf_styles()
+        buffer = BytesIO()
+        SimpleDocTemplate(buffer, pagesize=pagesizes.letter).build([
+            Paragraph(SHOPPING_LIST_TITLE, header_style),
+            ListFlowable(
+                [
+                    ListItem(
+                        Paragraph(
+                            format_shopping_list_item(item), regular_style
+                        )
+                    )
+                    for item in items
+                ],
+                bulletType='bullet'
+            )
+        ])
+        return buffer.getvalue()
+
+
+class TXTShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render_shopping_list(self, items):
+        return '\n'.join((
+            SHOPPING_LIST_TITLE,
+            '',
+            *(f'- {format_shopping_list_item(item)}' for item in items),
+            ''
+        )).encode(self.charset)
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render_shopping_list(self, items):
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+        writer.writerows(
+            (
+                item['name'],
+                item['total_amount'],
+                item['measurement_unit']
+            )
+            for item in items
+        )
+        return buffer.getvalue().encode(self.charset)
+
+
+SHOPPING_LIST_RENDERERS = {
+    renderer.format: renderer
+    for renderer in (
+        PDFShoppingListRenderer,
+        TXTShoppingListRenderer,
+        CSVShoppingListRenderer
+    )
+}
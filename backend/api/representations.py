@@ -0,0 +1,141 @@
+"""
+Быстрое представление рецептов и авторов для чтения.
+
+Словари строятся прямо из строк values(), без полей DRF и вложенных
+сериализаторов. Вывод совпадает с RecipeReadSerializer,
+RecipeShortReadSerializer и AuthorSerializer.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+
+from recipes.models import Recipe, RecipeIngredient
+
+User = get_user_model()
+
+RECIPE_FIELDS = (
+    'id', 'name', 'image', 'text', 'cooking_time', 'created_at',
+    'author_id', 'author__email', 'author__username', 'author__first_name',
+    'author__last_name', 'author__avatar',
+    'is_favorited', 'is_in_shopping_cart', 'author_is_subscribed'
+)
+SHORT_RECIPE_FIELDS = ('id', 'name', 'image', 'cooking_time')
+AUTHOR_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
+    'recipes_count'
+)
+
+
+class FileURL:
+    """Повторяет ImageField.to_representation для имени файла из строки."""
+
+    def __init__(self, request, model, field):
+        self.request = request
+        self.storage = model._meta.get_field(field).storage
+
+    def __call__(self, name):
+        if not name:
+            return None
+        url = self.storage.url(name)
+        if self.request is None:
+            return url
+        return self.request.build_absolute_uri(url)
+
+
+def get_recipe_tags(recipe_ids):
+    tags = defaultdict(list)
+    for recipe_id, tag_id, name, slug in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag__name').values_list(
+        'recipe_id', 'tag_id', 'tag__name', 'tag__slug'
+    ):
+        tags[recipe_id].append({'id': tag_id, 'name': name, 'slug': slug})
+    return tags
+
+
+def get_recipe_ingredients(recipe_ids):
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, name, unit, amount in (
+        RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('ingredient__name').values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        )
+    ):
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def represent_recipes(rows, request):
+    """Представление рецептов из строк values(*RECIPE_FIELDS)."""
+    recipe_ids = [row['id'] for row in rows]
+    tags = get_recipe_tags(recipe_ids)
+    ingredients = get_recipe_ingredients(recipe_ids)
+    image_url = FileURL(request, Recipe, 'image')
+    avatar_url = FileURL(request, User, 'avatar')
+    return [
+        {
+            'id': row['id'],
+            'ingredients': ingredients[row['id']],
+            'tags': tags[row['id']],
+            'image': image_url(row['image']),
+            'author': {
+                'email': row['author__email'],
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': row['author_is_subscribed'],
+                'avatar': avatar_url(row['author__avatar']),
+            },
+            'is_favorited': row['is_favorited'],
+            'is_in_shopping_cart': row['is_in_shopping_cart'],
+            'name': row['name'],
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        } for row in rows
+    ]
+
+
+def represent_short_recipe(row, image_url):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'image': image_url(row['image']),
+        'cooking_time': row['cooking_time'],
+    }
+
+
+def represent_authors(rows, recipes_queryset, request):
+    """
+    Представление авторов подписок из строк values(*AUTHOR_FIELDS);
+    рецепты каждого автора берутся из recipes_queryset одним запросом.
+    """
+    image_url = FileURL(request, Recipe, 'image')
+    avatar_url = FileURL(request, User, 'avatar')
+    recipes = defaultdict(list)
+    for row in recipes_queryset.filter(
+        author_id__in=[row['id'] for row in rows]
+    ).values('author_id', *SHORT_RECIPE_FIELDS):
+        recipes[row['author_id']].append(
+            represent_short_recipe(row, image_url)
+        )
+    return [
+        {
+            'email': row['email'],
+            'id': row['id'],
+            'username': row['username'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'is_subscribed': True,
+            'recipes': recipes[row['id']],
+            'recipes_count': row['recipes_count'],
+            'avatar': avatar_url(row['avatar']),
+        } for row in rows
+    ]
@@ -1,14 +1,23 @@
+import json
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.utils import html
 
-from core.constants import PARAM_RECIPES_LIMIT_MIN_VALUE
-from core.fields import Base64ImageField
+from core.constants import (BATCH_RECIPES_MAX_COUNT,
+                            PARAM_RECIPES_LIMIT_MIN_VALUE)
+from core.fields import Base64ImageField, PrimaryKeyListField
 from core.serializers import BaseUserSerializer
+from jobs.models import Job
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
-from users.models import Subscription
+from recipes.tasks import delete_files_later
+
+from .shopping_cart import invalidate_recipes
 
 User = get_user_model()
 
@@ -19,6 +28,17 @@ class RecipesLimitSerializer(serializers.Serializer):
     )
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=BATCH_RECIPES_MAX_COUNT
+    )
+
+    def validate_recipes(self, recipes):
+        return list(dict.fromkeys(recipes))
+
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
@@ -48,6 +68,14 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ('id', 'amount')
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientSerializer(
         many=True,
@@ -61,15 +89,25 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ('short_link_code', 'created_at')
+        exclude = (
+            'short_link_code',
+            'created_at',
+            'favorites_count',
+            'fanned_out'
+        )
 
     def get_author(self, obj):
+        author = obj.author
+        if hasattr(obj, 'author_is_subscribed'):
+            author.is_subscribed = obj.author_is_subscribed
         return UserSerializer(
-            obj.author,
+            author,
             context=self.context
         ).data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         return (
             user.is_authenticated
@@ -77,6 +115,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         return (
             user.is_authenticated
@@ -85,24 +125,44 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
-    ingredients = RecipeIngredientSerializer(
+    ingredients = RecipeIngredientWriteSerializer(
         many=True,
         source='recipe_ingredients'
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = PrimaryKeyListField(queryset=Tag.objects.all())
     image = Base64ImageField()
     author = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
+    json_fields = ('ingredients', 'tags')
+
     class Meta:
         model = Recipe
         exclude = (
             'short_link_code',
-            'created_at'
+            'created_at',
+            'favorites_count',
+            'fanned_out'
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if html.is_html_input(getattr(self, 'initial_data', None)):
+            self.initial_data = self.parse_multipart(self.initial_data)
+
+    def parse_multipart(self, data):
+        """
+        Разбирает multipart-форму: изображение приходит файлом,
+        а ингредиенты и теги — строками JSON.
+        """
+        data = data.dict()
+        for field in self.json_fields:
+            if field in data:
+                try:
+                    data[field] = json.loads(data[field])
+                except ValueError:
+                    pass
+        return data
+
     def validate(self, data):
         errors = {}
         ingredients = self.initial_data.get('ingredients')
@@ -130,33 +190,98 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             raise ValidationError(errors)
         return data
 
+    def validate_ingredients(self, ingredients):
+        """
+        Проверяет все ингредиенты одним запросом. Ошибки привязаны
+        к элементам списка, как у вложенного поля с PrimaryKeyRelatedField.
+        """
+        found = Ingredient.objects.in_bulk(
+            {ingredient['id'] for ingredient in ingredients}
+        )
+        message = serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ]
+        errors = [
+            {} if ingredient['id'] in found
+            else {'id': [message.format(pk_value=ingredient['id'])]}
+            for ingredient in ingredients
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+        for ingredient in ingredients:
+            ingredient['ingredient'] = found[ingredient.pop('id')]
+        return ingredients
+
     def create(self, validated_data):
         return self.save_recipe(validated_data)
 
     def update(self, instance, validated_data):
         return self.save_recipe(validated_data, instance)
 
+    @transaction.atomic
     def save_recipe(self, validated_data, instance=None):
-        """Универсальная функция для создания и обновления."""
+        """
+        Универсальная функция для создания и обновления.
+
+        Ингредиенты и теги сравниваются с текущими, в БД пишутся только
+        изменения, а все запросы идут в одной транзакции.
+        """
         ingredients = validated_data.pop('recipe_ingredients')
         tags = validated_data.pop('tags')
-        recipe, _ = Recipe.objects.update_or_create(
-            id=instance.id if instance else None,
-            defaults=validated_data
-        )
-        recipe.recipe_ingredients.all().delete()
-        RecipeIngredient.objects.bulk_create([
+        if instance is None:
+            recipe = Recipe.objects.create(**validated_data)
+            current = {}
+        else:
+            recipe = instance
+            image = recipe.image.name
+            for field, value in validated_data.items():
+                setattr(recipe, field, value)
+            recipe.save()
+            if recipe.image.name != image:
+                delete_files_later(image)
+            current = {
+                recipe_ingredient.ingredient_id: recipe_ingredient
+                for recipe_ingredient in recipe.recipe_ingredients.order_by()
+            }
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = current.keys() - amounts.keys()
+        changed = [
+            recipe_ingredient
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id in amounts
+            and recipe_ingredient.amount != amounts[ingredient_id]
+        ]
+        for recipe_ingredient in changed:
+            recipe_ingredient.amount = amounts[recipe_ingredient.ingredient_id]
+        added = [
             RecipeIngredient(
                 recipe=recipe,
-                ingredient=ingredient['ingredient'],
-                amount=ingredient['amount']
-            ) for ingredient in ingredients
-        ])
+                ingredient_id=ingredient_id,
+                amount=amount
+            ) for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ]
+        if removed:
+            recipe.recipe_ingredients.filter(
+                ingredient_id__in=removed
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if added:
+            RecipeIngredient.objects.bulk_create(added)
+        if removed or changed or added:
+            invalidate_recipes((recipe.id,))
         recipe.tags.set(tags)
 
         return recipe
 
     def to_representation(self, data):
+        prefetch_related_objects(
+            (data,), 'tags', 'recipe_ingredients__ingredient'
+        )
         return (
             RecipeReadSerializer(
                 context=self.context
@@ -190,7 +315,6 @@ class UserAvatarSerializer(serializers.ModelSerializer):
 
 class AuthorSerializer(BaseUserSerializer):
     recipes = RecipeShortReadSerializer(many=True, source='limited_recipes')
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -199,51 +323,12 @@ class AuthorSerializer(BaseUserSerializer):
             'is_subscribed', 'recipes', 'recipes_count', 'avatar'
         )
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
-
-class SubscriptionSerializer(serializers.ModelSerializer):
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    author = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
-
-    class Meta:
-        model = Subscription
-        fields = '__all__'
-
-    def validate(self, data):
-        user = data['user']
-        author = data['author']
-        if user == author:
-            raise ValidationError('Нельзя подписаться на самого себя.')
-        if Subscription.objects.filter(user=user, author=author).exists():
-            raise ValidationError('Вы уже подписаны на этого автора.')
-        return data
-
 
-class BaseUserRecipeSerializer(serializers.ModelSerializer):
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    recipe = serializers.PrimaryKeyRelatedField(queryset=Recipe.objects.all())
+class JobSerializer(serializers.ModelSerializer):
 
     class Meta:
-        abstract = True
-        fields = '__all__'
-
-    def validate(self, data):
-        if self.Meta.model.objects.filter(
-            user=data['user'], recipe=data['recipe']
-        ).exists():
-            raise ValidationError('Рецепт уже добавлен.')
-        return data
-
-
-class ShoppingCartSerializer(BaseUserRecipeSerializer):
-
-    class Meta(BaseUserRecipeSerializer.Meta):
-        model = ShoppingCart
-
-
-class FavoriteSerializer(BaseUserRecipeSerializer):
-
-    class Meta(BaseUserRecipeSerializer.Meta):
-        model = Favorite
+        model = Job
+        fields = (
+            'id', 'status', 'attempts', 'error', 'result', 'file',
+            'created_at', 'updated_at'
+        )
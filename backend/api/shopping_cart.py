@@ -0,0 +1,94 @@
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.constants import SHOPPING_CART_CACHE_TIMEOUT
+from core.versions import delete_versions, get_versions
+from recipes.models import RecipeIngredient, ShoppingCart, UnitConversion
+
+UNITS_VERSION_KEY = 'shopping_cart:units_version'
+
+
+def get_recipe_version_key(recipe_id):
+    return f'shopping_cart:recipe_version:{recipe_id}'
+
+
+def get_cart_version(user_id):
+    """
+    Возвращает версию корзины пользователя.
+
+    Версия складывается из состава корзины и версий ингредиентов каждого
+    рецепта в ней, поэтому после любого изменения старые отрисовки просто
+    перестают читаться.
+    """
+    recipe_ids = sorted(
+        ShoppingCart.objects.filter(
+            user_id=user_id
+        ).order_by().values_list('recipe_id', flat=True)
+    )
+    keys = [
+        UNITS_VERSION_KEY,
+        *(get_recipe_version_key(recipe_id) for recipe_id in recipe_ids)
+    ]
+    versions = get_versions(keys)
+    return md5(
+        ' '.join(
+            f'{recipe_id}:{versions.get(key)}'
+            for recipe_id, key in zip(('units', *recipe_ids), keys)
+        ).encode()
+    ).hexdigest()
+
+
+def invalidate_recipes(recipe_ids):
+    delete_versions(
+        get_recipe_version_key(recipe_id) for recipe_id in recipe_ids
+    )
+
+
+def invalidate_units():
+    delete_versions((UNITS_VERSION_KEY,))
+
+
+def get_ingredients_summary(user):
+    """
+    Итог по корзине одним запросом: количества переводятся в
+    каноническую единицу по таблице UnitConversion и суммируются в БД.
+    """
+    conversion = UnitConversion.objects.filter(
+        unit=OuterRef('ingredient__measurement_unit')
+    )
+    return (
+        RecipeIngredient.objects.filter(
+            recipe__shoppingcart_users__user=user
+        ).annotate(
+            name=F('ingredient__name'),
+            measurement_unit=Coalesce(
+                Subquery(conversion.values('canonical_unit')[:1]),
+                F('ingredient__measurement_unit')
+            ),
+            factor=Coalesce(
+                Subquery(conversion.values('factor')[:1]), Value(1)
+            )
+        ).values(
+            'name', 'measurement_unit'
+        ).annotate(
+            total_amount=Sum(F('amount') * F('factor'))
+        ).order_by(
+            'name', 'measurement_unit'
+        )
+    )
+
+
+def render_cart(user, renderer):
+    """Отдает отрисованный список покупок из кеша или рендерит заново."""
+    key = (
+        f'shopping_cart:rendered:{user.id}:'
+        f'{get_cart_version(user.id)}:{renderer.format}'
+    )
+    content = cache.get(key)
+    if content is None:
+        content = renderer.render(list(get_ingredients_summary(user)))
+        cache.set(key, content, SHOPPING_CART_CACHE_TIMEOUT)
+    return content
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, Tag,
+                            UnitConversion)
+from recipes.signals import catalog_loaded
+
+from . import recipe_cache
+from .authentication import invalidate_user
+from .catalog import ingredients_catalog, tags_catalog
+from .ingredient_index import ingredient_index
+from .shopping_cart import invalidate_recipes, invalidate_units
+
+User = get_user_model()
+EMBEDDED_AUTHOR_FIELDS = {
+    'email', 'username', 'first_name', 'last_name', 'avatar'
+}
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    """Деактивация, смена пароля и профиля сбрасывают кеш токенов."""
+    if not created:
+        invalidate_user(instance.id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Выход через djoser и любое другое удаление токена."""
+    invalidate_user(instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipes((instance.recipe_id,))
+    recipe_cache.invalidate_recipes((instance.recipe_id,))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    recipe_cache.invalidate_recipes((instance.id,))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    """Сбрасывает рецепты автора при смене имени, почты или аватара."""
+    if created:
+        return
+    if update_fields and not EMBEDDED_AUTHOR_FIELDS & set(update_fields):
+        return
+    # У пользователя из кеша токенов счетчик отложен: вместо его
+    # загрузки сразу выбираются рецепты.
+    if (
+        'recipes_count' not in instance.get_deferred_fields()
+        and not instance.recipes_count
+    ):
+        return
+    recipe_cache.invalidate_recipes(
+        instance.recipes.order_by().values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_recipes(
+            instance.ingredient_recipes.order_by().values_list(
+                'recipe_id', flat=True
+            )
+        )
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_catalog_changed(sender, **kwargs):
+    ingredient_index.invalidate()
+    ingredients_catalog.invalidate()
+    recipe_cache.invalidate_all()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_catalog_changed(sender, **kwargs):
+    tags_catalog.invalidate()
+    recipe_cache.invalidate_all()
+
+
+@receiver(catalog_loaded)
+def catalog_reloaded(sender, **kwargs):
+    ingredient_index.invalidate()
+    ingredients_catalog.invalidate()
+    tags_catalog.invalidate()
+
+
+@receiver((post_save, post_delete), sender=UnitConversion)
+def unit_conversion_changed(sender, **kwargs):
+    invalidate_units()
@@ -0,0 +1,17 @@
+from django.core.files.base import ContentFile
+
+from jobs.queue import task
+
+from .renderers import SHOPPING_LIST_RENDERERS
+from .shopping_cart import render_cart
+
+
+@task
+def render_shopping_cart(job):
+    """Отрисовывает список покупок в файл задачи."""
+    renderer = SHOPPING_LIST_RENDERERS[job.payload['format']]()
+    job.file.save(
+        f'shopping_cart.{renderer.format}',
+        ContentFile(render_cart(job.user, renderer)),
+        save=False
+    )
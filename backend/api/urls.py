@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .views import (IngredientViewSet, JobViewSet, RecipeViewSet, TagViewSet,
+                    UserViewSet)
 
 app_name = 'api'
 router = DefaultRouter()
@@ -10,6 +11,7 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('users', UserViewSet, basename='users')
+router.register('jobs', JobViewSet, basename='jobs')
 
 urlpatterns = (
     path('', include(router.urls)),
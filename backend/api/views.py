@@ -1,42 +1,66 @@
-from io import BytesIO
-
-from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Prefetch, Sum
-from django.http import FileResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.core.cache import cache
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
-from reportlab.lib import enums, pagesizes, styles
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import (ListFlowable, ListItem, Paragraph,
-                                SimpleDocTemplate)
-from rest_framework import status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import (AllowAny, IsAuthenticated,
+                                        IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+from core.constants import (RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH,
+                            RECIPES_CACHE_TIMEOUT)
+from jobs.models import Job
+from recipes.feed import pull_popular_authors
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
                             ShoppingCart, Tag)
-from recipes.utils import generate_unique_short_link_code
+from recipes.tasks import delete_files_later
+from recipes.utils import decode_short_link_code, encode_short_link_code
 from users.models import Subscription
 
+from .catalog import ingredients_catalog, tags_catalog
 from .filters import IngredientFilter, RecipeFilter
+from .ingredient_index import ingredient_index
+from .pagination import (FeedPagination, RecipePagination,
+                         SubscriptionPagination)
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (AuthorSerializer, FavoriteSerializer,
-                          IngredientSerializer, RecipeReadSerializer,
-                          RecipeShortReadSerializer, RecipesLimitSerializer,
-                          RecipeWriteSerializer, ShoppingCartSerializer,
-                          SubscriptionSerializer, TagSerializer,
-                          UserAvatarSerializer)
+from .recipe_cache import get_detail_key, get_list_key, json_response
+from .renderers import SHOPPING_LIST_RENDERERS, FormatContentNegotiation
+from .representations import (AUTHOR_FIELDS, RECIPE_FIELDS, represent_authors,
+                              represent_recipes)
+from .serializers import (AuthorSerializer, IngredientSerializer,
+                          JobSerializer, RecipeIdsSerializer,
+                          RecipeReadSerializer, RecipeShortReadSerializer,
+                          RecipesLimitSerializer, RecipeWriteSerializer,
+                          TagSerializer, UserAvatarSerializer)
+from .shopping_cart import render_cart
+from .tasks import render_shopping_cart
 
 User = get_user_model()
 
 
 class UserViewSet(DjoserUserViewSet):
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Subscription.objects.filter(user=user, author=OuterRef('pk'))
+            )
+        )
 
     def get_permissions(self):
         if self.action in ('list', 'retrieve'):
@@ -51,40 +75,67 @@ class UserViewSet(DjoserUserViewSet):
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
+        avatar = request.user.avatar.name
         serializer.save()
+        delete_files_later(avatar)
         return Response(serializer.data)
 
     @update_avatar.mapping.delete
     def delete_avatar(self, request):
-        request.user.avatar.delete()
+        delete_files_later(request.user.avatar.name)
+        request.user.avatar = None
+        request.user.save(update_fields=('avatar',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(('post',), detail=True, url_path='subscribe')
-    def add_subscription(self, request, id):
-        recipes_limit_serializer = RecipesLimitSerializer(
-            data=request.query_params, context={'request': request}
-        )
-        recipes_limit_serializer.is_valid(raise_exception=True)
-        recipes_limit = recipes_limit_serializer.validated_data.get(
-            'recipes_limit'
+    def get_limited_recipes(self):
+        """
+        Рецепты авторов подписок: не более recipes_limit последних
+        у каждого, с отбором в БД.
+        """
+        limit_serializer = RecipesLimitSerializer(
+            data=self.request.query_params
         )
+        limit_serializer.is_valid(raise_exception=True)
+        recipes_limit = limit_serializer.validated_data.get('recipes_limit')
         recipes_queryset = Recipe.objects.all()
-        author = get_object_or_404(
-            User.objects.filter(id=id).prefetch_related(
-                Prefetch(
-                    'recipes',
-                    queryset=recipes_queryset,
-                    to_attr='limited_recipes'
+        if recipes_limit:
+            recipes_queryset = recipes_queryset.filter(
+                pk__in=Subquery(
+                    Recipe.objects.filter(
+                        author=OuterRef('author')
+                    ).values('pk')[:recipes_limit]
                 )
             )
+        return recipes_queryset
+
+    def get_authors_queryset(self, queryset):
+        return queryset.annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).prefetch_related(
+            Prefetch(
+                'recipes',
+                queryset=self.get_limited_recipes(),
+                to_attr='limited_recipes'
+            )
         )
-        if recipes_limit:
-            recipes_queryset = recipes_queryset[:recipes_limit]
-        subscription_serializer = SubscriptionSerializer(
-            data={'author': author.id}, context={'request': request}
+
+    @action(('post',), detail=True, url_path='subscribe')
+    def add_subscription(self, request, id):
+        author = get_object_or_404(
+            self.get_authors_queryset(User.objects.all()), id=id
         )
-        subscription_serializer.is_valid(raise_exception=True)
-        subscription_serializer.save()
+        if author == request.user:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Нельзя подписаться на самого себя.'
+                ]
+            })
+        if not Subscription.subscribe(request.user, author):
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы уже подписаны на этого автора.'
+                ]
+            })
         return Response(
             AuthorSerializer(author, context={'request': request}).data,
             status=status.HTTP_201_CREATED
@@ -92,43 +143,23 @@ class UserViewSet(DjoserUserViewSet):
 
     @add_subscription.mapping.delete
     def remove_subscription(self, request, id):
-        author = get_object_or_404(User, id=id)
-        subscription = Subscription.objects.filter(
-            user=request.user,
-            author=author
-        )
-        if subscription:
-            subscription.delete()
+        if Subscription.unsubscribe(request.user, id):
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(User, id=id)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
     @action(('get',), detail=False, url_path='subscriptions')
     def get_subscriptions(self, request):
-        limit_serializer = RecipesLimitSerializer(
-            data=request.query_params
+        recipes = self.get_limited_recipes()
+        paginator = SubscriptionPagination()
+        authors = paginator.paginate_queryset(
+            User.objects.filter(
+                subscribed_by__user=request.user
+            ).values(*AUTHOR_FIELDS),
+            request
         )
-        limit_serializer.is_valid(raise_exception=True)
-        recipes_limit = limit_serializer.validated_data.get(
-            'recipes_limit'
-        )
-        recipes_queryset = Recipe.objects.all()
-        authors = User.objects.filter(
-            subscribed_by__user=request.user
-        ).prefetch_related(
-            Prefetch(
-                'recipes',
-                queryset=recipes_queryset,
-                to_attr='limited_recipes'
-            )
-        )
-        if recipes_limit:
-            recipes_queryset = recipes_queryset[:recipes_limit]
-        paginator = api_settings.DEFAULT_PAGINATION_CLASS()
-        authors = paginator.paginate_queryset(authors, request)
         return paginator.get_paginated_response(
-            AuthorSerializer(
-                authors, many=True, context={'request': request}
-            ).data
+            represent_authors(authors, recipes, request)
         )
 
 
@@ -137,6 +168,9 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return tags_catalog.response(request)
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
@@ -145,28 +179,104 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return ingredients_catalog.response(request)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+    lookup_value_regex = r'\d+'
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     http_method_names = (
         'post', 'patch', 'get', 'delete', 'head', 'options'
     )
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        queryset = Recipe.objects.select_related('author')
+        if self.action not in ('list', 'retrieve', 'feed'):
+            return queryset
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                author_is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            author_is_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=user, author=OuterRef('author')
+                )
+            )
+        )
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
-    def add_to(self, request, pk, serializer_class, model_class):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        serializer = serializer_class(
-            data={'recipe': recipe.id}, context={'request': request}
+    def cached_response(self, request, get_key, handler, *args, **kwargs):
+        """
+        Отдает анонимным клиентам готовый JSON из кеша, не обращаясь
+        к БД; при промахе строит ответ обычным путем и сохраняет его.
+        """
+        renderer = request.accepted_renderer
+        if request.user.is_authenticated or renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        key = get_key()
+        body = cache.get(key)
+        if body is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = renderer.render(
+                response.data,
+                request.accepted_media_type,
+                self.get_renderer_context()
+            )
+            cache.set(key, body, RECIPES_CACHE_TIMEOUT)
+        return json_response(body)
+
+    def list_recipes(self, request):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).values(*RECIPE_FIELDS)
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        return self.get_paginated_response(represent_recipes(page, request))
+
+    def retrieve_recipe(self, request, pk):
+        recipe = get_object_or_404(
+            self.get_queryset().values(*RECIPE_FIELDS), pk=pk
+        )
+        return Response(represent_recipes((recipe,), request)[0])
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: get_list_key(request), self.list_recipes
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: get_detail_key(request, kwargs['pk']),
+            self.retrieve_recipe, kwargs['pk']
+        )
+
+    def add_to(self, request, pk, model_class):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        if not model_class.add_recipe(request.user, recipe.id):
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ['Рецепт уже добавлен.']
+            })
         return Response(
             RecipeShortReadSerializer(
                 recipe, context={'request': request}
@@ -175,22 +285,86 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
     def remove_from(self, request, pk, model_class):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        model_object = model_class.objects.filter(
-            user=request.user,
-            recipe=recipe
-        )
-        if model_object:
-            model_object.delete()
+        if model_class.remove_recipe(request.user, pk):
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, pk=pk)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    def add_many_to(self, request, model_class):
+        """Добавляет список рецептов, возвращая результат по каждому id."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        found = set(Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', flat=True))
+        added = set(model_class.add_recipes(
+            request.user,
+            [recipe_id for recipe_id in recipe_ids if recipe_id in found]
+        ))
+        return Response([
+            {
+                'id': recipe_id,
+                'status': (
+                    'added' if recipe_id in added
+                    else 'exists' if recipe_id in found
+                    else 'not_found'
+                )
+            } for recipe_id in recipe_ids
+        ])
+
+    def remove_many_from(self, request, model_class):
+        """Удаляет список рецептов, возвращая результат по каждому id."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        removed = set(model_class.remove_recipes(request.user, recipe_ids))
+        return Response([
+            {
+                'id': recipe_id,
+                'status': 'removed' if recipe_id in removed else 'missing'
+            } for recipe_id in recipe_ids
+        ])
+
+    @action(
+        ('get',),
+        detail=False,
+        url_path='feed',
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """
+        Лента рецептов авторов из подписок, от новых к старым.
+
+        Страница выбирается одним проходом по индексу ленты, затем рецепты
+        страницы загружаются по id.
+        """
+        pull_popular_authors(request.user.id)
+        paginator = FeedPagination()
+        entries = paginator.paginate_queryset(
+            FeedEntry.objects.filter(user=request.user), request, self
+        )
+        recipes = {
+            recipe['id']: recipe for recipe in self.get_queryset().filter(
+                id__in=[entry.recipe_id for entry in entries]
+            ).order_by().values(*RECIPE_FIELDS)
+        }
+        return paginator.get_paginated_response(represent_recipes(
+            [
+                recipes[entry.recipe_id] for entry in entries
+                if entry.recipe_id in recipes
+            ],
+            request
+        ))
+
     @action(('get',), detail=True, url_path='get-link')
     def get_short_link(self, request, pk):
         recipe = self.get_object()
         if not recipe.short_link_code:
-            recipe.short_link_code = generate_unique_short_link_code()
-            recipe.save(update_fields=('short_link_code',))
+            recipe.short_link_code = encode_short_link_code(recipe.id)
+            Recipe.objects.filter(
+                id=recipe.id, short_link_code__isnull=True
+            ).update(short_link_code=recipe.short_link_code)
         return Response({
             'short-link': request.build_absolute_uri(
                 f'/s/{recipe.short_link_code}'
@@ -199,77 +373,118 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(('post',), detail=True, url_path='shopping_cart')
     def add_to_cart(self, request, pk):
-        return self.add_to(
-            request, pk, ShoppingCartSerializer, ShoppingCart
-        )
+        return self.add_to(request, pk, ShoppingCart)
 
     @add_to_cart.mapping.delete
     def remove_from_cart(self, request, pk):
         return self.remove_from(request, pk, ShoppingCart)
 
+    @action(('post',), detail=False, url_path='shopping_cart')
+    def add_many_to_cart(self, request):
+        return self.add_many_to(request, ShoppingCart)
+
+    @add_many_to_cart.mapping.delete
+    def remove_many_from_cart(self, request):
+        return self.remove_many_from(request, ShoppingCart)
+
     @action(('post',), detail=True, url_path='favorite')
     def add_to_favorite(self, request, pk):
-        return self.add_to(request, pk, FavoriteSerializer, Favorite)
+        return self.add_to(request, pk, Favorite)
 
     @add_to_favorite.mapping.delete
     def remove_from_favorite(self, request, pk):
         return self.remove_from(request, pk, Favorite)
 
-    @action(('get',), detail=False, url_path='download_shopping_cart')
+    @action(('post',), detail=False, url_path='favorite')
+    def add_many_to_favorite(self, request):
+        return self.add_many_to(request, Favorite)
+
+    @add_many_to_favorite.mapping.delete
+    def remove_many_from_favorite(self, request):
+        return self.remove_many_from(request, Favorite)
+
+    @action(
+        ('get',),
+        detail=False,
+        url_path='shopping_list',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_list(self, request):
+        """Список покупок в JSON, тот же итог, что и в файлах."""
+        return HttpResponse(
+            render_cart(request.user, JSONRenderer()),
+            content_type='application/json'
+        )
+
+    @action(
+        ('get',),
+        detail=False,
+        url_path='download_shopping_cart',
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=tuple(SHOPPING_LIST_RENDERERS.values()),
+        content_negotiation_class=FormatContentNegotiation
+    )
     def download_shopping_cart(self, request):
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=pagesizes.letter)
-        pdfmetrics.registerFont(
-            TTFont(
-                'OpenSans',
-                settings.BASE_DIR / 'fonts/OpenSans-Regular.ttf'
+        """
+        Файл списка покупок. С заголовком Prefer: respond-async файл
+        отрисовывает воркер, а ответ 202 ведет на статус задачи.
+        """
+        renderer = request.accepted_renderer
+        if prefers_async(request):
+            job = render_shopping_cart.enqueue(
+                {'format': renderer.format}, request.user
             )
-        )
-        header_style = styles.ParagraphStyle(
-            'HeaderStyle',
-            fontName='OpenSans',
-            fontSize=14,
-            alignment=enums.TA_CENTER,
-            spaceAfter=25
-        )
-        regular_style = styles.ParagraphStyle(
-            'RegularStyle',
-            fontName='OpenSans',
-            fontSize=12,
-            spaceAfter=10
-        )
-        ingredients_summary = (
-            RecipeIngredient.objects.filter(
-                recipe__shoppingcart_users__user=request.user
-            ).values(
-                'ingredient__name', 'ingredient__measurement_unit'
-            ).annotate(
-                total_amount=Sum('amount')
-            ).order_by(
-                'ingredient__name'
+            return Response(
+                JobSerializer(job, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={
+                    'Location': reverse('api:jobs-detail', args=(job.id,)),
+                    'Preference-Applied': 'respond-async',
+                }
             )
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = HttpResponse(
+            render_cart(request.user, renderer),
+            content_type=content_type
         )
-        header = Paragraph('Список покупок', header_style)
-        bullet_points = ListFlowable(
-            [
-                ListItem(
-                    Paragraph(
-                        f'{item["ingredient__name"]} — {item["total_amount"]} '
-                        f'{item["ingredient__measurement_unit"]}',
-                        regular_style
-                    )
-                )
-                for item in ingredients_summary
-            ],
-            bulletType='bullet'
-        )
-        doc.build([header, bullet_points])
-        buffer.seek(0)
-        return FileResponse(
-            buffer,
-            as_attachment=True,
-            filename='shopping_cart.pdf'
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{renderer.format}"'
         )
+        return response
+
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Статус фоновой задачи; видны только задачи пользователя."""
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+
+def prefers_async(request):
+    return 'respond-async' in (
+        preference.split(';')[0].strip().lower()
+        for preference in request.headers.get('Prefer', '').split(',')
+    )
+
+
+def get_short_link_location(code):
+    """Возвращает адрес страницы рецепта по короткому коду."""
+    recipe_id = decode_short_link_code(code)
+    if recipe_id is not None:
+        recipes = Recipe.objects.filter(id=recipe_id)
+    elif len(code) <= RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH:
+        recipes = Recipe.objects.filter(short_link_code=code)
+    else:
+        raise Http404
+    recipe_id = get_object_or_404(recipes.values_list('id', flat=True))
+    return reverse(
+        'api:recipes-detail',
+        kwargs={'pk': recipe_id}
+    ).replace('/api', '')
 
 
 def redirect_to_recipe_detail(request, code):
@@ -277,10 +492,4 @@ def redirect_to_recipe_detail(request, code):
     Перенаправляет пользователя на детальную страницу рецепта по короткому
     коду.
     """
-    recipe = get_object_or_404(Recipe, short_link_code=code)
-    return redirect(
-        reverse(
-            'api:recipes-detail',
-            kwargs={'pk': recipe.id}
-        ).replace('/api', '')
-    )
+    return redirect(get_short_link_location(code))
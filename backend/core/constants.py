@@ -1,7 +1,8 @@
 INGREDIENT_NAME_MAX_LENGTH = 128
 INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH = 64
 RECIPE_NAME_MAX_LENGTH = 150
-RECIPE_SHORT_LINK_CODE_MAX_LENGTH = 3
+RECIPE_SHORT_LINK_CODE_MAX_LENGTH = 13
+RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH = 3
 RECIPE_COOKING_TIME_MIN_VALUE = 1
 RECIPE_INGREDIENT_AMOUNT_MIN_VALUE = 1
 TAG_NAME_MAX_LENGTH = 32
@@ -10,3 +11,21 @@ OBJECT_NAME_MAX_DISPLAY_LENGTH = 64
 PARAM_RECIPES_LIMIT_MIN_VALUE = 1
 PAGINATION_PAGE_SIZE = 10
 RECIPE_TEXT_MAX_LENGTH = 5000
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPES_CACHE_TIMEOUT = 60 * 60
+INGREDIENT_SEARCH_LIMIT = 50
+CATALOG_CACHE_MAX_AGE = 60
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_DECODE_CHUNK_SIZE = 64 * 1024
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+BATCH_RECIPES_MAX_COUNT = 100
+FEED_BACKFILL_SIZE = 100
+FEED_FANOUT_MAX_SUBSCRIBERS = 10_000
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 10
+JOB_LEASE_TIMEOUT = 10 * 60
+JOB_POLL_INTERVAL = 1
+JOB_KEEP_TIME = 60 * 60 * 24
+JOB_NAME_MAX_LENGTH = 128
+AUTH_TOKEN_CACHE_SIZE = 10_000
+AUTH_TOKEN_CACHE_TIMEOUT = 5 * 60
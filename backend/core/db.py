@@ -0,0 +1,96 @@
+"""
+Запись одним запросом с возвратом действительно затронутых строк.
+
+Счетчики и другие производные данные нужно менять по тому, что сделал
+сам DELETE или INSERT, а не по предварительной выборке: между ними
+параллельный запрос может удалить или вставить те же строки.
+"""
+from django.db import connections
+from django.db.models import sql
+from django.db.models.sql.constants import CURSOR
+
+
+def can_return_rows(connection):
+    """RETURNING есть в PostgreSQL и в SQLite начиная с 3.35."""
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def delete_rows(queryset, returning=None):
+    """
+    Удаляет строки queryset одним DELETE — без выборки объектов, каскада
+    и сигналов — и возвращает значения поля returning удаленных строк,
+    а без returning — их число.
+
+    Там, где нет RETURNING, строки удаляются по одной, и каждое удаление
+    проверяется по числу затронутых строк.
+    """
+    connection = connections[queryset.db]
+    query = queryset.query.clone()
+    query.__class__ = sql.DeleteQuery
+    compiler = query.get_compiler(connection=connection)
+    if returning is None:
+        cursor = compiler.execute_sql(CURSOR)
+        if not cursor:
+            return 0
+        with cursor:
+            return cursor.rowcount
+    if not can_return_rows(connection):
+        return [
+            value for value in queryset.values_list(returning, flat=True)
+            if delete_rows(queryset.filter(**{returning: value}))
+        ]
+    statement, params = compiler.as_sql()
+    column = queryset.model._meta.get_field(returning).column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{statement} RETURNING {connection.ops.quote_name(column)}',
+            params
+        )
+        return [value for value, in cursor.fetchall()]
+
+
+def insert_rows(model, rows, returning, using='default'):
+    """
+    Вставляет словари rows (ключи — имена полей или attname) одним
+    INSERT ... ON CONFLICT DO NOTHING и возвращает значения поля
+    returning действительно вставленных строк: строки, которые уже были
+    или которые успел вставить параллельный запрос, в результат не
+    попадают.
+    """
+    if not rows:
+        return []
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    fields = {name: model._meta.get_field(name) for name in rows[0]}
+    columns = ', '.join(quote(field.column) for field in fields.values())
+    placeholders = f'({", ".join(["%s"] * len(fields))})'
+    values = [
+        [
+            field.get_db_prep_save(row[name], connection)
+            for name, field in fields.items()
+        ]
+        for row in rows
+    ]
+    statement = (
+        f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+        f'VALUES {{}} ON CONFLICT DO NOTHING'
+    )
+    with connection.cursor() as cursor:
+        if can_return_rows(connection):
+            column = model._meta.get_field(returning).column
+            cursor.execute(
+                statement.format(', '.join([placeholders] * len(rows)))
+                + f' RETURNING {quote(column)}',
+                [value for row in values for value in row]
+            )
+            return [value for value, in cursor.fetchall()]
+        inserted = []
+        for row, row_values in zip(rows, values):
+            cursor.execute(statement.format(placeholders), row_values)
+            if cursor.rowcount:
+                inserted.append(row[returning])
+        return inserted
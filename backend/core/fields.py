@@ -1,17 +1,109 @@
 import base64
+import binascii
 
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from rest_framework import serializers
 
+from .constants import IMAGE_DECODE_CHUNK_SIZE, IMAGE_MAX_SIZE
+
+IMAGE_SIGNATURES = (
+    b'\x89PNG\r\n\x1a\n',
+    b'\xff\xd8\xff',
+    b'GIF87a',
+    b'GIF89a',
+    b'RIFF',
+)
+
+
+class DecodedImageFile(TemporaryUploadedFile):
+    """
+    Временный файл декодированного изображения.
+
+    Хранилище перемещает его на место вместо копирования, поэтому
+    закрывать файл нужно с учетом того, что его уже может не быть.
+    """
+
+    def __del__(self):
+        self.close()
+
 
 class Base64ImageField(serializers.ImageField):
-    """Поле для загрузки изображений в формате base64."""
+    """
+    Поле для загрузки изображений в формате base64 или файлом multipart.
+
+    Строка base64 декодируется по частям во временный файл: размер
+    проверяется до декодирования, а формат — по первым байтам, поэтому
+    слишком большие и битые изображения отбрасываются сразу.
+    """
+    default_error_messages = {
+        'max_size': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+    max_size = IMAGE_MAX_SIZE
+
     def to_internal_value(self, data):
         """Преобразует строку base64 в объект ImageField."""
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+            data = self.decode(data)
+        elif getattr(data, 'size', 0) > self.max_size:
+            self.fail('max_size', max_size=self.max_size)
+        return super().to_internal_value(data)
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    def decode(self, data):
+        format, _, imgstr = data.partition(';base64,')
+        ext = format.split('/')[-1]
+        imgstr = imgstr.strip()
+        if len(imgstr) // 4 * 3 > self.max_size:
+            self.fail('max_size', max_size=self.max_size)
+        file = DecodedImageFile(
+            name='temp.' + ext,
+            content_type=f'image/{ext}',
+            size=0,
+            charset=None
+        )
+        try:
+            for start in range(0, len(imgstr), IMAGE_DECODE_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    imgstr[start:start + IMAGE_DECODE_CHUNK_SIZE],
+                    validate=True
+                )
+                if not start and not chunk.startswith(IMAGE_SIGNATURES):
+                    self.fail('invalid_image')
+                file.write(chunk)
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_image')
+        except serializers.ValidationError:
+            file.close()
+            raise
+        file.size = file.tell()
+        if not file.size:
+            file.close()
+            self.fail('empty')
+        file.seek(0)
+        return file
 
-        return super().to_internal_value(data)
+
+class PrimaryKeyListField(serializers.ListField):
+    """
+    Список первичных ключей, который проверяется одним запросом IN,
+    а не отдельным запросом на каждый элемент.
+    """
+    default_error_messages = {
+        'does_not_exist': (
+            serializers.PrimaryKeyRelatedField.default_error_messages[
+                'does_not_exist'
+            ]
+        ),
+    }
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        super().__init__(child=serializers.IntegerField(), **kwargs)
+
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        objects = self.queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                self.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in pks]
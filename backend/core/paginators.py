@@ -0,0 +1,30 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .constants import ADMIN_ESTIMATED_COUNT_THRESHOLD
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц.
+
+    Для queryset без фильтров на PostgreSQL число строк берется
+    из статистики планировщика вместо полного COUNT(*), если таблица
+    больше ADMIN_ESTIMATED_COUNT_THRESHOLD строк.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    (queryset.model._meta.db_table,)
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
@@ -5,8 +5,10 @@ class BaseUserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         return (
             user.is_authenticated
-            and obj.subscriptions.filter(user=user).exists()
+            and obj.subscribed_by.filter(user=user).exists()
         )
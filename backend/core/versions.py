@@ -0,0 +1,48 @@
+"""
+Версии данных в общем кеше.
+
+Закешированное значение хранится под ключом с версиями данных, от
+которых оно зависит. При изменении данных версия удаляется, следующее
+чтение заводит новую, а старые записи просто перестают читаться и
+истекают сами.
+"""
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def new_version():
+    return uuid4().hex
+
+
+def get_versions(keys, make_version=new_version):
+    """
+    Возвращает словарь версий по ключам.
+
+    Недостающие версии заводятся через cache.add и перечитываются,
+    поэтому параллельные запросы сходятся на одной версии.
+    """
+    keys = list(keys)
+    versions = cache.get_many(keys)
+    missing_keys = [key for key in keys if key not in versions]
+    if missing_keys:
+        for key in missing_keys:
+            cache.add(key, make_version(), None)
+        versions.update(cache.get_many(missing_keys))
+    return versions
+
+
+def get_version(key, make_version=new_version):
+    return get_versions((key,), make_version).get(key)
+
+
+def delete_versions(keys):
+    """
+    Удаляет версии сразу и еще раз после фиксации транзакции: иначе
+    запрос, прочитавший старые данные до фиксации, сохранил бы их
+    под новой версией.
+    """
+    keys = list(keys)
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
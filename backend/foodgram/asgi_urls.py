@@ -0,0 +1,19 @@
+"""
+Маршруты режима ASGI: чтение рецептов, тегов, ингредиентов и короткие
+ссылки обслуживают асинхронные представления, остальное — как в
+foodgram.urls.
+"""
+from django.urls import path
+
+from api import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/recipes/', async_views.recipe_list),
+    path('api/recipes/<int:pk>/', async_views.recipe_detail),
+    path('api/tags/', async_views.tag_list),
+    path('api/ingredients/', async_views.ingredient_list),
+    path('s/<slug:code>/', async_views.redirect_to_recipe_detail),
+    *sync_urlpatterns,
+]
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     'users',
     'recipes',
     'api',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -47,7 +48,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+# В режиме ASGI чтение обслуживают асинхронные представления, а
+# синхронный DebugToolbarMiddleware не переводит запросы обратно в потоки.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False').lower() == 'true'
+
+if ASYNC_READ_VIEWS:
+    MIDDLEWARE.remove('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+ROOT_URLCONF = 'foodgram.asgi_urls' if ASYNC_READ_VIEWS else 'foodgram.urls'
 
 TEMPLATES = [
     {
@@ -66,6 +74,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
 
 
 DATABASES = {
@@ -79,6 +88,28 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+# Кеш токенов сбрасывается через общий кеш Django. Кеш в памяти процесса
+# не виден другим воркерам: выход и деактивация в одном из них не дошли бы
+# до остальных, поэтому с ним токены проверяются по БД на каждый запрос.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+TOKEN_AUTHENTICATION_CLASS = (
+    'rest_framework.authentication.TokenAuthentication'
+    if CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHE_BACKENDS
+    else 'api.authentication.CachedTokenAuthentication'
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -119,9 +150,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
-    ),
+    'DEFAULT_AUTHENTICATION_CLASSES': (TOKEN_AUTHENTICATION_CLASS,),
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberPagination',
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
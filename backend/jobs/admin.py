@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'name', 'status', 'attempts', 'user', 'run_after', 'updated_at'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('id', 'name')
+    readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('user',)
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.constants import JOB_KEEP_TIME, JOB_POLL_INTERVAL
+from jobs.queue import claim_job, purge_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер фоновых задач: забирает задачи из очереди в БД и '
+        'выполняет их, а когда очередь пуста, опрашивает ее с паузой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти, когда очередь опустеет.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=JOB_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        purged_at = None
+        while True:
+            if purged_at is None or (
+                time.monotonic() - purged_at > JOB_KEEP_TIME
+            ):
+                purge_jobs()
+                purged_at = time.monotonic()
+            job = claim_job()
+            if job is not None:
+                run_job(job)
+                self.stdout.write(
+                    f'{job.name} ({job.id}): {job.get_status_display()}'
+                )
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
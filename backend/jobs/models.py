@@ -0,0 +1,96 @@
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+from core.constants import JOB_MAX_ATTEMPTS, JOB_NAME_MAX_LENGTH
+
+User = get_user_model()
+
+
+def get_job_file_path(job, filename):
+    return f'jobs/{job.id}/{filename}'
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди; воркер — команда run_jobs."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    name = models.CharField(
+        verbose_name='Задача',
+        max_length=JOB_NAME_MAX_LENGTH
+    )
+    payload = models.JSONField(
+        verbose_name='Параметры',
+        default=dict
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        null=True,
+        blank=True
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=max(len(value) for value in Status.values),
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток',
+        default=JOB_MAX_ATTEMPTS
+    )
+    run_after = models.DateTimeField(
+        verbose_name='Выполнить не раньше',
+        default=timezone.now
+    )
+    error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+    result = models.JSONField(
+        verbose_name='Результат',
+        null=True,
+        blank=True
+    )
+    file = models.FileField(
+        verbose_name='Файл результата',
+        upload_to=get_job_file_path,
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создана',
+        auto_now_add=True
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Изменена',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('run_after',),
+                condition=models.Q(status__in=('pending', 'running')),
+                name='job_queue_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
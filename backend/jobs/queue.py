@@ -0,0 +1,130 @@
+"""
+Очередь фоновых задач в таблице jobs_job.
+
+Задачи регистрируются декоратором task в модулях tasks.py приложений и
+ставятся в очередь в той же транзакции, что и породившее их изменение.
+Внешний брокер не нужен: воркер run_jobs забирает задачи прямо из БД.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.constants import (JOB_KEEP_TIME, JOB_LEASE_TIMEOUT, JOB_MAX_ATTEMPTS,
+                            JOB_RETRY_DELAY)
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def enqueue(name, payload=None, user=None, max_attempts=JOB_MAX_ATTEMPTS):
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        user=user,
+        max_attempts=max_attempts
+    )
+
+
+def task(function=None, *, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Регистрирует функцию job -> результат как задачу. Поставить ее в
+    очередь можно через function.enqueue(payload, user).
+    """
+    def register(function):
+        name = f'{function.__module__}.{function.__name__}'
+        TASKS[name] = function
+        function.enqueue = partial(enqueue, name, max_attempts=max_attempts)
+        return function
+
+    return register if function is None else register(function)
+
+
+def claim_job():
+    """
+    Забирает готовую к выполнению задачу или возвращает None.
+
+    В PostgreSQL строка блокируется SELECT ... FOR UPDATE SKIP LOCKED, и
+    воркеры не ждут друг друга. В SQLite блокировок строк нет, поэтому
+    задачу забирает условный UPDATE по числу попыток: из нескольких
+    воркеров он пройдет только у одного. Задача в статусе RUNNING с
+    истекшей арендой (воркер упал) снова попадает в выборку.
+    """
+    while True:
+        now = timezone.now()
+        queue = Job.objects.filter(
+            status__in=(Job.Status.PENDING, Job.Status.RUNNING),
+            run_after__lte=now
+        ).order_by('run_after')
+        with transaction.atomic():
+            if connection.features.has_select_for_update_skip_locked:
+                queue = queue.select_for_update(skip_locked=True)
+            job = queue.first()
+            if job is None:
+                return None
+            job.status = Job.Status.RUNNING
+            job.run_after = now + timedelta(seconds=JOB_LEASE_TIMEOUT)
+            claimed = Job.objects.filter(
+                id=job.id, attempts=job.attempts
+            ).update(
+                status=job.status,
+                attempts=job.attempts + 1,
+                run_after=job.run_after,
+                updated_at=now
+            )
+        if claimed:
+            job.attempts += 1
+            return job
+
+
+def run_job(job):
+    """Выполняет забранную задачу; после ошибки повтор идет с паузой."""
+    function = TASKS.get(job.name)
+    try:
+        if function is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована.')
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Последняя попытка не завершилась вовремя.')
+        with transaction.atomic():
+            job.result = function(job)
+    except Exception as error:
+        logger.exception('Задача %s (%s) завершилась ошибкой.', job.name,
+                         job.id)
+        job.error = ''.join(
+            traceback.format_exception_only(type(error), error)
+        ).strip()
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.Status.FAILED
+    else:
+        job.status = Job.Status.DONE
+        job.error = ''
+    # Если аренда истекла и задачу забрал другой воркер, его результат
+    # не затирается.
+    Job.objects.filter(id=job.id, attempts=job.attempts).update(
+        status=job.status,
+        run_after=job.run_after,
+        error=job.error,
+        result=job.result,
+        file=job.file.name,
+        updated_at=timezone.now()
+    )
+    return job
+
+
+def purge_jobs():
+    """Удаляет завершенные задачи старше JOB_KEEP_TIME вместе с файлами."""
+    return Job.objects.filter(
+        status__in=(Job.Status.DONE, Job.Status.FAILED),
+        updated_at__lt=timezone.now() - timedelta(seconds=JOB_KEEP_TIME)
+    ).delete()[0]
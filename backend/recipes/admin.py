@@ -4,9 +4,10 @@ from django.urls import reverse
 from django.utils.html import format_html
 
 from api.contsants import MIN_AMOUNT
+from core.paginators import EstimatedCountPaginator
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     ShoppingCart, Tag, UnitConversion)
 
 
 class RecipeIngredientFormSet(BaseInlineFormSet):
@@ -49,10 +50,19 @@ class RecipeAdmin(admin.ModelAdmin):
         'author__email'
     )
     list_filter = ('tags',)
-    readonly_fields = ('author', 'short_link_code', 'created_at')
+    readonly_fields = (
+        'author', 'short_link_code', 'created_at', 'favorites_count'
+    )
     filter_horizontal = ('tags',)
     inlines = (RecipeIngredientInline,)
     ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).prefetch_related('ingredients')
 
     @admin.display(description='Изображение')
     def image_preview(self, obj):
@@ -69,14 +79,10 @@ class RecipeAdmin(admin.ModelAdmin):
             obj.author = request.user
         super().save_model(request, obj, form, change)
 
-    @admin.display(description='В избранном')
-    def favorites_count(self, obj):
-        return obj.favorite_users.count()
-
     @admin.display(description='Автор')
     def author_link(self, obj):
         url = reverse(
-            'admin:users_user_change', args=(obj.author.id,)
+            'admin:users_user_change', args=(obj.author_id,)
         )
         return format_html('<a href="{}">{}</a>', url, obj.author)
 
@@ -94,6 +100,13 @@ class IngredientAdmin(admin.ModelAdmin):
     ordering = ('name',)
 
 
+@admin.register(UnitConversion)
+class UnitConversionAdmin(admin.ModelAdmin):
+    list_display = ('unit', 'factor', 'canonical_unit')
+    search_fields = ('unit', 'canonical_unit')
+    ordering = ('unit',)
+
+
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug')
@@ -106,12 +119,16 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount')
     search_fields = ('recipe__name', 'ingredient__name')
     ordering = ('recipe__name', 'ingredient__name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class BaseUserRecipeAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
     ordering = ('user__username', 'recipe__name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
@@ -0,0 +1,68 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class CountersMixin:
+    """
+    Модель с денормализованными счетчиками.
+
+    Счетчики меняет только UPDATE с F() (change_counters), поэтому save()
+    существующего объекта их не пишет: иначе значение, прочитанное при
+    загрузке, затерло бы параллельные изменения.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counters(model, pks, delta, *fields):
+    """Атомарно меняет счетчики объектов на delta одним UPDATE."""
+    model.objects.filter(pk__in=pks).update(
+        **{field: F(field) + delta for field in fields}
+    )
+
+
+def count_related(queryset, field):
+    """Подзапрос с числом строк queryset, ссылающихся на объект по field."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        0
+    )
+
+
+def rebuild_counters(recipe_model, user_model, favorite_model,
+                     subscription_model):
+    """
+    Пересчитывает денормализованные счетчики с нуля.
+
+    Принимает модели аргументами, чтобы работать и в миграциях.
+    """
+    recipe_model.objects.update(
+        favorites_count=count_related(favorite_model.objects, 'recipe')
+    )
+    user_model.objects.update(
+        recipes_count=count_related(recipe_model.objects, 'author'),
+        favorite_recipes_count=count_related(favorite_model.objects, 'user'),
+        subscriptions_count=count_related(subscription_model.objects, 'user'),
+        subscribers_count=count_related(
+            subscription_model.objects, 'author'
+        )
+    )
@@ -0,0 +1,139 @@
+"""
+Лента рецептов авторов, на которых подписан пользователь.
+
+Лента хранится в таблице recipes_feed и заполняется при записи: новый
+рецепт раскладывается подписчикам автора, а новая подписка дозаполняет
+ленту последними рецептами автора. Чтение ленты — один проход по индексу
+(user, created_at, recipe).
+
+Рецепты авторов, у которых подписчиков больше FEED_FANOUT_MAX_SUBSCRIBERS,
+не раскладываются при публикации, а помечаются fanned_out = FALSE. Перед
+чтением ленты один SELECT проверяет, есть ли у читателя такие рецепты,
+и только тогда они дописываются в ленту. Пометка остается на рецепте,
+поэтому он подтягивается и после того, как подписчиков у автора станет
+меньше порога.
+
+Функции работают на чистом SQL без импорта моделей, поэтому их можно
+вызывать из моделей и миграций.
+"""
+from django.db import connection
+
+from core.constants import FEED_BACKFILL_SIZE, FEED_FANOUT_MAX_SUBSCRIBERS
+
+FEED_TABLE = 'recipes_feed'
+RECIPE_TABLE = 'recipes_recipe'
+SUBSCRIPTION_TABLE = 'users_subscriptions'
+USER_TABLE = 'users_user'
+FEED_COLUMNS = '(user_id, recipe_id, author_id, created_at)'
+
+
+def execute(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def fan_out_recipe(recipe_id):
+    """
+    Раскладывает новый рецепт подписчикам автора одним INSERT.
+
+    Если INSERT ничего не вставил, у автора либо нет подписчиков, либо
+    их больше порога; во втором случае рецепт помечается
+    fanned_out = FALSE. Возвращает новое значение fanned_out.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FEED_TABLE} {FEED_COLUMNS} '
+            'SELECT s.user_id, r.id, r.author_id, r.created_at '
+            f'FROM {RECIPE_TABLE} r '
+            f'JOIN {USER_TABLE} a ON a.id = r.author_id '
+            f'JOIN {SUBSCRIPTION_TABLE} s ON s.author_id = r.author_id '
+            'WHERE r.id = %s AND a.subscribers_count <= %s',
+            (recipe_id, FEED_FANOUT_MAX_SUBSCRIBERS)
+        )
+        if cursor.rowcount:
+            return True
+        cursor.execute(
+            f'UPDATE {RECIPE_TABLE} SET fanned_out = %s '
+            f'WHERE id = %s AND author_id IN (SELECT id FROM {USER_TABLE} '
+            'WHERE subscribers_count > %s)',
+            (False, recipe_id, FEED_FANOUT_MAX_SUBSCRIBERS)
+        )
+        return not cursor.rowcount
+
+
+def backfill_author(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    execute(
+        f'INSERT INTO {FEED_TABLE} {FEED_COLUMNS} '
+        'SELECT %s, id, author_id, created_at FROM ('
+        f'SELECT id, author_id, created_at FROM {RECIPE_TABLE} '
+        'WHERE author_id = %s ORDER BY created_at DESC, id DESC LIMIT %s'
+        ') AS latest WHERE true ON CONFLICT DO NOTHING',
+        (user_id, author_id, FEED_BACKFILL_SIZE)
+    )
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты рецепты автора после отписки."""
+    execute(
+        f'DELETE FROM {FEED_TABLE} WHERE user_id = %s AND author_id = %s',
+        (user_id, author_id)
+    )
+
+
+def pull_popular_authors(user_id):
+    """
+    Подтягивает в ленту рецепты, не разложенные при публикации: только
+    рецепты новее уже имеющихся в ленте и не больше FEED_BACKFILL_SIZE
+    на автора.
+
+    Обычно подтягивать нечего, и чтение ленты обходится одним SELECT
+    без записи. Возвращает True, если лента дописывалась.
+    """
+    missing = (
+        'SELECT s.user_id, r.id, r.author_id, r.created_at '
+        f'FROM {SUBSCRIPTION_TABLE} s '
+        f'JOIN {RECIPE_TABLE} r ON r.author_id = s.author_id '
+        'WHERE s.user_id = %s AND NOT r.fanned_out '
+        f'AND r.id IN (SELECT id FROM {RECIPE_TABLE} '
+        'WHERE author_id = s.author_id '
+        'ORDER BY created_at DESC, id DESC LIMIT %s) '
+        f'AND NOT EXISTS (SELECT 1 FROM {FEED_TABLE} f '
+        'WHERE f.user_id = s.user_id AND f.author_id = s.author_id '
+        'AND (f.created_at > r.created_at OR f.recipe_id = r.id))'
+    )
+    params = (user_id, FEED_BACKFILL_SIZE)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT EXISTS ({missing})', params)
+        if not cursor.fetchone()[0]:
+            return False
+    execute(
+        f'INSERT INTO {FEED_TABLE} {FEED_COLUMNS} {missing} '
+        'ON CONFLICT DO NOTHING',
+        params
+    )
+    return True
+
+
+def rebuild_feed(schema_editor=None):
+    """
+    Пересобирает ленты всех пользователей: последние FEED_BACKFILL_SIZE
+    рецептов каждого автора, на которого есть подписка.
+    """
+    sql = (
+        f'DELETE FROM {FEED_TABLE}',
+        f'INSERT INTO {FEED_TABLE} {FEED_COLUMNS} '
+        'SELECT s.user_id, r.id, r.author_id, r.created_at '
+        f'FROM {SUBSCRIPTION_TABLE} s JOIN ('
+        'SELECT id, author_id, created_at, ROW_NUMBER() OVER ('
+        'PARTITION BY author_id ORDER BY created_at DESC, id DESC'
+        f') AS position FROM {RECIPE_TABLE}'
+        ') AS r ON r.author_id = s.author_id '
+        f'WHERE r.position <= {int(FEED_BACKFILL_SIZE)}',
+    )
+    if schema_editor is not None:
+        for statement in sql:
+            schema_editor.execute(statement)
+        return
+    for statement in sql:
+        execute(statement, ())
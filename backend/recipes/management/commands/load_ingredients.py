@@ -0,0 +1,144 @@
+import csv
+import json
+from io import StringIO
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Ingredient, Tag
+from recipes.signals import catalog_loaded
+
+DEFAULT_BATCH_SIZE = 1000
+FIXTURE_MODELS = {
+    'recipes.ingredient': (Ingredient, ('name', 'measurement_unit')),
+    'recipes.tag': (Tag, ('name', 'slug')),
+}
+
+
+def read_csv(path):
+    """Построчно читает CSV «название,единица измерения» без заголовка."""
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            if row:
+                yield Ingredient, tuple(value.strip() for value in row[:2])
+
+
+def read_json(path):
+    """Читает фикстуру в формате dumpdata для ингредиентов и тегов."""
+    with open(path, encoding='utf-8') as file:
+        objects = json.load(file)
+    for obj in objects:
+        try:
+            model, fields = FIXTURE_MODELS[obj['model']]
+        except KeyError:
+            raise CommandError(f'Неподдерживаемая модель: {obj["model"]}')
+        yield model, tuple(obj['fields'][field] for field in fields)
+
+
+def batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Пакетно загружает ингредиенты и теги из CSV или JSON. '
+        'Повторный запуск безопасен: существующие записи пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            default=(settings.BASE_DIR / 'ingredients.json',),
+            help='Файлы .csv или .json (по умолчанию ingredients.json).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Число строк в одной пачке.'
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY даже на PostgreSQL.'
+        )
+
+    def handle(self, *args, **options):
+        self.use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        for path in map(Path, options['paths']):
+            if path.suffix == '.csv':
+                rows = read_csv(path)
+            elif path.suffix == '.json':
+                rows = read_json(path)
+            else:
+                raise CommandError(f'Неизвестный формат файла: {path}')
+            self.load(path, rows, options['batch_size'])
+        catalog_loaded.send(sender=self.__class__)
+
+    def load(self, path, rows, batch_size):
+        started = perf_counter()
+        counts_before = {
+            model: model.objects.count()
+            for model, _ in FIXTURE_MODELS.values()
+        }
+        total = 0
+        with transaction.atomic():
+            for batch in batches(rows, batch_size):
+                total += len(batch)
+                for model, fields in FIXTURE_MODELS.values():
+                    values = [row for row_model, row in batch
+                              if row_model is model]
+                    if not values:
+                        continue
+                    if self.use_copy and model is Ingredient:
+                        self.copy(model, fields, values)
+                    else:
+                        model.objects.bulk_create(
+                            (model(**dict(zip(fields, row)))
+                             for row in values),
+                            ignore_conflicts=True
+                        )
+        created = sum(
+            model.objects.count() - count
+            for model, count in counts_before.items()
+        )
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{path.name}: прочитано {total}, добавлено {created} '
+            f'за {elapsed:.2f} с ({total / max(elapsed, 1e-9):.0f} строк/с).'
+        ))
+
+    def copy(self, model, fields, values):
+        """Загружает пачку через COPY во временную таблицу и INSERT."""
+        table = model._meta.db_table
+        columns = ', '.join(fields)
+        buffer = StringIO()
+        csv.writer(buffer).writerows(values)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE tmp_{table} ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY tmp_{table} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT DISTINCT {columns} FROM tmp_{table} '
+                'ON CONFLICT DO NOTHING'
+            )
+            cursor.execute(f'DROP TABLE tmp_{table}')
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import rebuild_counters
+from recipes.models import Favorite, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики избранного, подписок и рецептов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_counters(Recipe, User, Favorite, Subscription)
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_feed
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок всех пользователей.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_feed()
+        self.stdout.write(self.style.SUCCESS('Ленты пересобраны.'))
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_alter_recipe_cooking_time'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_link_code',
+            field=models.CharField(blank=True, max_length=13, null=True, unique=True, verbose_name='Код короткой ссылки'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 07:24
+
+from django.db import migrations, models
+
+from recipes.counters import rebuild_counters
+
+
+def fill_counters(apps, schema_editor):
+    rebuild_counters(
+        apps.get_model('recipes', 'Recipe'),
+        apps.get_model('users', 'User'),
+        apps.get_model('recipes', 'Favorite'),
+        apps.get_model('users', 'Subscription')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_alter_recipe_short_link_code'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
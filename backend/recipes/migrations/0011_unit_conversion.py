@@ -0,0 +1,44 @@
+# Generated by Django 3.2.25 on 2026-10-17 08:07
+
+import django.core.validators
+from django.db import migrations, models
+
+UNIT_CONVERSIONS = (
+    ('кг', 'г', 1000),
+    ('л', 'мл', 1000),
+    ('ст. л.', 'ч. л.', 3),
+)
+
+
+def add_conversions(apps, schema_editor):
+    UnitConversion = apps.get_model('recipes', 'UnitConversion')
+    UnitConversion.objects.bulk_create(
+        UnitConversion(unit=unit, canonical_unit=canonical_unit, factor=factor)
+        for unit, canonical_unit, factor in UNIT_CONVERSIONS
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit', models.CharField(max_length=64, unique=True, verbose_name='Единица измерения')),
+                ('canonical_unit', models.CharField(max_length=64, verbose_name='Каноническая единица')),
+                ('factor', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Множитель')),
+            ],
+            options={
+                'verbose_name': 'Перевод единиц',
+                'verbose_name_plural': 'Переводы единиц',
+                'db_table': 'recipes_unit_conversion',
+                'ordering': ('unit',),
+            },
+        ),
+        migrations.RunPython(add_conversions, migrations.RunPython.noop),
+    ]
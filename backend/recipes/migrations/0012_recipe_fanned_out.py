@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 09:27
+
+from django.db import migrations, models
+
+from recipes.search import (create_sqlite_search_index,
+                            drop_sqlite_search_index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_unit_conversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            drop_sqlite_search_index, create_sqlite_search_index
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False, help_text='Рецепты популярных авторов читатели подтягивают сами.', verbose_name='Разложен по лентам'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-created_at'], name='recipe_not_fanned_out_idx'),
+        ),
+        migrations.RunPython(
+            create_sqlite_search_index, drop_sqlite_search_index
+        ),
+    ]
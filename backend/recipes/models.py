@@ -13,7 +13,9 @@ from core.constants import (INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH,
                             RECIPE_TEXT_MAX_LENGTH,
                             RECIPE_SHORT_LINK_CODE_MAX_LENGTH,
                             TAG_NAME_MAX_LENGTH, TAG_SLUG_MAX_LENGTH)
+from core.db import delete_rows, insert_rows
 
+from .counters import CountersMixin, change_counters
 from .utils import make_relation_name
 
 User = get_user_model()
@@ -50,6 +52,35 @@ class Ingredient(models.Model):
         return f'{short_name} ({self.measurement_unit})'
 
 
+class UnitConversion(models.Model):
+    """
+    Перевод единицы измерения в каноническую: количество в unit равно
+    factor единиц canonical_unit. Единицы без записи не переводятся.
+    """
+    unit = models.CharField(
+        verbose_name='Единица измерения',
+        max_length=INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH,
+        unique=True
+    )
+    canonical_unit = models.CharField(
+        verbose_name='Каноническая единица',
+        max_length=INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH
+    )
+    factor = models.PositiveIntegerField(
+        verbose_name='Множитель',
+        validators=(MinValueValidator(1),)
+    )
+
+    class Meta:
+        verbose_name = 'Перевод единиц'
+        verbose_name_plural = 'Переводы единиц'
+        ordering = ('unit',)
+        db_table = 'recipes_unit_conversion'
+
+    def __str__(self):
+        return f'1 {self.unit} = {self.factor} {self.canonical_unit}'
+
+
 class Tag(models.Model):
     name = models.CharField(
         verbose_name='Название',
@@ -71,11 +102,14 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
+    counter_fields = ('favorites_count',)
+
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     name = models.CharField(
         verbose_name='Название',
@@ -131,12 +165,39 @@ class Recipe(models.Model):
         verbose_name='Дата и время публикации',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+        db_index=True
+    )
+    fanned_out = models.BooleanField(
+        verbose_name='Разложен по лентам',
+        help_text='Рецепты популярных авторов читатели подтягивают сами.',
+        default=True,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         default_related_name = 'recipes'
         ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('-created_at', '-id'),
+                name='recipe_created_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-created_at'),
+                name='recipe_author_created_idx'
+            ),
+            models.Index(
+                fields=('author', '-created_at'),
+                condition=models.Q(fanned_out=False),
+                name='recipe_not_fanned_out_idx'
+            ),
+        )
         db_table = 'recipes_recipe'
 
     def __str__(self):
@@ -152,7 +213,8 @@ class RecipeIngredient(models.Model):
         Recipe,
         verbose_name='Рецепт',
         on_delete=models.CASCADE,
-        related_name='recipe_ingredients'
+        related_name='recipe_ingredients',
+        db_index=False
     )
     ingredient = models.ForeignKey(
         Ingredient,
@@ -194,22 +256,96 @@ class BaseUserRecipe(models.Model):
         User,
         verbose_name='Пользователь',
         on_delete=models.CASCADE,
-        related_name='%(class)s_recipes'
+        related_name='%(class)s_recipes',
+        db_index=False
     )
     recipe = models.ForeignKey(
         Recipe,
         verbose_name='Рецепт',
         on_delete=models.CASCADE,
-        related_name='%(class)s_users'
+        related_name='%(class)s_users',
+        db_index=False
     )
 
     class Meta:
         abstract = True
         ordering = ('user__username', 'recipe__name')
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'),
+                name='%(class)s_recipe_user_idx'
+            ),
+        )
 
     def __str__(self):
         return make_relation_name(self.user, self.recipe)
 
+    @classmethod
+    def add_recipe(cls, user, recipe_id):
+        """
+        Добавляет рецепт пользователю одним INSERT.
+
+        Повтор пропускает ON CONFLICT DO NOTHING, поэтому параллельные
+        запросы не приводят к ошибке, а нарушения других ограничений
+        не маскируются. Возвращает False, если рецепт уже был добавлен.
+        """
+        return bool(cls.add_recipes(user, (recipe_id,)))
+
+    @classmethod
+    def remove_recipe(cls, user, recipe_id):
+        """
+        Удаляет рецепт пользователя одним DELETE.
+
+        Возвращает False, если рецепта у пользователя не было.
+        """
+        if not delete_rows(
+            cls.objects.filter(user=user, recipe_id=recipe_id)
+        ):
+            return False
+        cls.recipes_changed(user.id, (recipe_id,), -1)
+        return True
+
+    @classmethod
+    def add_recipes(cls, user, recipe_ids):
+        """
+        Добавляет рецепты пользователю одной вставкой.
+
+        Возвращает id рецептов, которых у пользователя еще не было.
+        Счетчики меняются только по строкам, которые вставил сам INSERT.
+        """
+        added = set(insert_rows(
+            cls,
+            [
+                {'user_id': user.id, 'recipe_id': recipe_id}
+                for recipe_id in dict.fromkeys(recipe_ids)
+            ],
+            'recipe_id'
+        ))
+        if added:
+            cls.recipes_changed(user.id, added, 1)
+        return [recipe_id for recipe_id in recipe_ids if recipe_id in added]
+
+    @classmethod
+    def remove_recipes(cls, user, recipe_ids):
+        """
+        Удаляет рецепты пользователя одним DELETE, без выборки объектов
+        и сигналов по каждой строке.
+
+        Возвращает id рецептов, которые удалил этот DELETE; строки,
+        удаленные параллельным запросом, в счетчиках не учитываются.
+        """
+        removed = delete_rows(
+            cls.objects.filter(user=user, recipe_id__in=recipe_ids),
+            'recipe_id'
+        )
+        if removed:
+            cls.recipes_changed(user.id, removed, -1)
+        return removed
+
+    @classmethod
+    def recipes_changed(cls, user_id, recipe_ids, delta):
+        """Обновляет зависящие от связи данные, например счетчики."""
+
 
 class ShoppingCart(BaseUserRecipe):
 
@@ -237,3 +373,60 @@ class Favorite(BaseUserRecipe):
             ),
         )
         db_table = 'recipes_favorites'
+
+    @classmethod
+    def recipes_changed(cls, user_id, recipe_ids, delta):
+        change_counters(Recipe, recipe_ids, delta, 'favorites_count')
+        change_counters(
+            User, (user_id,), delta * len(recipe_ids),
+            'favorite_recipes_count'
+        )
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        db_index=False
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата и время публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='uq_recipes_feed'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-created_at', '-recipe'),
+                name='feed_user_created_idx'
+            ),
+            models.Index(
+                fields=('user', 'author', 'created_at'),
+                name='feed_user_author_idx'
+            ),
+        )
+        db_table = 'recipes_feed'
+
+    def __str__(self):
+        return make_relation_name(self.user, self.recipe)
@@ -0,0 +1,138 @@
+"""
+Полнотекстовый поиск рецептов по названию и описанию.
+
+На PostgreSQL поиск идет по генерируемой колонке tsvector с индексом GIN
+и русской морфологией, результаты сортируются по ts_rank. На SQLite,
+которая используется для локальных тестов, вместо нее работает
+виртуальная таблица FTS5, синхронизируемая триггерами.
+"""
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+SEARCH_TABLE = 'recipes_recipe'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_FTS_TABLE = 'recipes_recipe_fts'
+SQLITE_NAME_WEIGHT = 10
+
+POSTGRESQL_CREATE = (
+    f'ALTER TABLE {SEARCH_TABLE} ADD COLUMN {SEARCH_VECTOR_COLUMN} tsvector '
+    'GENERATED ALWAYS AS ('
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')"
+    ') STORED',
+    f'CREATE INDEX {SEARCH_TABLE}_search_vector_idx ON {SEARCH_TABLE} '
+    f'USING gin ({SEARCH_VECTOR_COLUMN})',
+)
+POSTGRESQL_DROP = (
+    f'ALTER TABLE {SEARCH_TABLE} DROP COLUMN {SEARCH_VECTOR_COLUMN}',
+)
+SQLITE_CREATE = (
+    f'CREATE VIRTUAL TABLE {SEARCH_FTS_TABLE} USING fts5('
+    f"name, text, content='{SEARCH_TABLE}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}) VALUES ('rebuild')",
+    f'CREATE TRIGGER {SEARCH_FTS_TABLE}_insert AFTER INSERT ON {SEARCH_TABLE} '
+    f'BEGIN INSERT INTO {SEARCH_FTS_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    f'CREATE TRIGGER {SEARCH_FTS_TABLE}_delete AFTER DELETE ON {SEARCH_TABLE} '
+    f'BEGIN INSERT INTO {SEARCH_FTS_TABLE}'
+    f'({SEARCH_FTS_TABLE}, rowid, name, text) '
+    "VALUES ('delete', old.id, old.name, old.text); END",
+    f'CREATE TRIGGER {SEARCH_FTS_TABLE}_update AFTER UPDATE OF name, text '
+    f'ON {SEARCH_TABLE} BEGIN INSERT INTO {SEARCH_FTS_TABLE}'
+    f'({SEARCH_FTS_TABLE}, rowid, name, text) '
+    "VALUES ('delete', old.id, old.name, old.text); "
+    f'INSERT INTO {SEARCH_FTS_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+)
+SQLITE_DROP = (
+    f'DROP TRIGGER IF EXISTS {SEARCH_FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {SEARCH_FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {SEARCH_FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {SEARCH_FTS_TABLE}',
+)
+STATEMENTS = {
+    'postgresql': (POSTGRESQL_CREATE, POSTGRESQL_DROP),
+    'sqlite': (SQLITE_CREATE, SQLITE_DROP),
+}
+
+
+def create_search_index(apps, schema_editor):
+    create, _ = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in create:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    _, drop = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in drop:
+        schema_editor.execute(statement)
+
+
+def drop_sqlite_search_index(apps, schema_editor):
+    """
+    На SQLite AlterField и AddField пересоздают таблицу рецептов, и
+    триггеры FTS5 пропадают вместе со старой таблицей. Такие миграции
+    окружаются этой парой функций; на PostgreSQL они ничего не делают.
+    """
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_index(apps, schema_editor)
+
+
+def create_sqlite_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        create_search_index(apps, schema_editor)
+
+
+def make_fts_query(query):
+    """
+    Превращает строку пользователя в запрос FTS5: каждое слово ищется
+    как префикс, что частично заменяет отсутствующую морфологию.
+    """
+    return ' '.join(
+        '"{}"*'.format(word.replace('"', '""')) for word in query.split()
+    )
+
+
+def search_recipes(queryset, query):
+    """
+    Оставляет рецепты, подходящие под запрос, и сортирует их по
+    релевантности. Релевантность доступна в аннотации search_rank.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        match = RawSQL(
+            f'{SEARCH_TABLE}.{SEARCH_VECTOR_COLUMN} @@ {tsquery}',
+            (query,), output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f'ts_rank({SEARCH_TABLE}.{SEARCH_VECTOR_COLUMN}, {tsquery})',
+            (query,), output_field=FloatField()
+        )
+    elif vendor == 'sqlite':
+        fts_query = make_fts_query(query)
+        match = RawSQL(
+            f'{SEARCH_TABLE}.id IN (SELECT rowid FROM {SEARCH_FTS_TABLE} '
+            f'WHERE {SEARCH_FTS_TABLE} MATCH %s)',
+            (fts_query,), output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f'(SELECT -bm25({SEARCH_FTS_TABLE}, {SQLITE_NAME_WEIGHT}, 1) '
+            f'FROM {SEARCH_FTS_TABLE} '
+            f'WHERE {SEARCH_FTS_TABLE} MATCH %s '
+            f'AND rowid = {SEARCH_TABLE}.id)',
+            (fts_query,), output_field=FloatField()
+        )
+    else:
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        )
+    return queryset.filter(match).annotate(
+        search_rank=rank
+    ).order_by('-search_rank', '-created_at', '-id')
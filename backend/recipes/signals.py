@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .counters import change_counters
+from .feed import fan_out_recipe
+from .models import Favorite, Recipe
+from .tasks import delete_files_later
+
+User = get_user_model()
+
+# Пакетная загрузка справочников идет мимо post_save, поэтому о ней
+# сообщает отдельный сигнал: приложения со своими кешами сбрасывают их.
+catalog_loaded = Signal()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counters(User, (instance.author_id,), 1, 'recipes_count')
+        instance.fanned_out = fan_out_recipe(instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counters(User, (instance.author_id,), -1, 'recipes_count')
+    delete_files_later(instance.image.name)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        sender.recipes_changed(instance.user_id, (instance.recipe_id,), 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    sender.recipes_changed(instance.user_id, (instance.recipe_id,), -1)
@@ -0,0 +1,16 @@
+from django.core.files.storage import default_storage
+
+from jobs.queue import task
+
+
+@task
+def delete_files(job):
+    """Удаляет из хранилища файлы, на которые больше нет ссылок."""
+    for name in job.payload['names']:
+        default_storage.delete(name)
+
+
+def delete_files_later(*names):
+    names = [name for name in names if name]
+    if names:
+        delete_files.enqueue({'names': names})
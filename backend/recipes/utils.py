@@ -1,20 +1,51 @@
-import secrets
+from string import ascii_lowercase, digits
 from textwrap import shorten
 
+from django.db.models import BigIntegerField
+
 from core.constants import (OBJECT_NAME_MAX_DISPLAY_LENGTH,
-                            RECIPE_SHORT_LINK_CODE_MAX_LENGTH)
+                            RECIPE_SHORT_LINK_CODE_MAX_LENGTH,
+                            RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH)
 
+SHORT_LINK_ALPHABET = digits + ascii_lowercase
+# Коды, выданные до перехода на кодирование id, были случайными и не длиннее
+# RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH символов. Смещение делает новые коды
+# длиннее, поэтому они никогда не совпадают со старыми.
+SHORT_LINK_OFFSET = len(SHORT_LINK_ALPHABET) ** (
+    RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH
+)
 
-def generate_unique_short_link_code():
-    from .models import Recipe
-    while True:
-        random_code = (
-            secrets.token_urlsafe().replace('_', '').replace('-', '')[
-                :RECIPE_SHORT_LINK_CODE_MAX_LENGTH
-            ].lower()
-        )
-        if not Recipe.objects.filter(short_link_code=random_code).exists():
-            return random_code
+
+def encode_short_link_code(recipe_id):
+    """Обратимо кодирует id рецепта в код короткой ссылки."""
+    number = recipe_id + SHORT_LINK_OFFSET
+    code = ''
+    while number:
+        number, remainder = divmod(number, len(SHORT_LINK_ALPHABET))
+        code = SHORT_LINK_ALPHABET[remainder] + code
+    return code
+
+
+def decode_short_link_code(code):
+    """
+    Возвращает id рецепта или None для старых и некорректных кодов.
+
+    Принимается только код, который выдала бы encode_short_link_code:
+    иначе разные адреса (с заглавными буквами, ведущими нулями,
+    подчеркиваниями) вели бы на один рецепт.
+    """
+    if not (
+        RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH < len(code)
+        <= RECIPE_SHORT_LINK_CODE_MAX_LENGTH
+    ) or not set(code) <= set(SHORT_LINK_ALPHABET):
+        return None
+    recipe_id = int(code, len(SHORT_LINK_ALPHABET)) - SHORT_LINK_OFFSET
+    if (
+        recipe_id > BigIntegerField.MAX_BIGINT
+        or encode_short_link_code(recipe_id) != code
+    ):
+        return None
+    return recipe_id
 
 
 def make_relation_name(obj_1, obj_2):
@@ -0,0 +1,243 @@
+import json
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import CachedTokenAuthentication
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription
+
+User = get_user_model()
+
+SEED = 2025
+USERS_COUNT = int(os.getenv('BENCHMARK_USERS', 300))
+RECIPES_COUNT = int(os.getenv('BENCHMARK_RECIPES', 3000))
+INGREDIENTS_COUNT = 500
+TAGS_COUNT = 6
+INGREDIENTS_PER_RECIPE = 8
+TAGS_PER_RECIPE = 2
+FAVORITES_PER_USER = 20
+CARTS_PER_USER = 10
+SUBSCRIPTIONS_PER_USER = 15
+ROUNDS = int(os.getenv('BENCHMARK_ROUNDS', 10))
+REPORT_PATH = Path(
+    os.getenv('BENCHMARK_REPORT', Path(__file__).parent / 'benchmark.json')
+)
+PASSWORD = 'benchmark-password'
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA'
+    'CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoA'
+    'AAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+
+def seed_database():
+    """
+    Заполняет базу объемами, сопоставимыми с продовыми.
+
+    SQLite не возвращает первичные ключи из bulk_create, поэтому объекты
+    перечитываются после каждой вставки.
+    """
+    rng = random.Random(SEED)
+    User.objects.bulk_create(
+        User(
+            username=f'user{number}',
+            email=f'user{number}@foodgram.ru',
+            first_name=f'Имя{number}',
+            last_name=f'Фамилия{number}',
+            password='!'
+        )
+        for number in range(USERS_COUNT)
+    )
+    users = list(User.objects.order_by('id'))
+    Tag.objects.bulk_create(
+        Tag(name=f'Тег {number}', slug=f'tag{number}')
+        for number in range(TAGS_COUNT)
+    )
+    tags = list(Tag.objects.order_by('id'))
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(INGREDIENTS_COUNT)
+    )
+    ingredients = list(Ingredient.objects.order_by('id'))
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=users[number % USERS_COUNT],
+            name=f'Рецепт {number}',
+            text='Описание рецепта.',
+            image='recipe_images/benchmark.png',
+            cooking_time=rng.randint(1, 120),
+            short_link_code=f'{number:03x}'[-3:] if number < 4096 else None
+        )
+        for number in range(RECIPES_COUNT)
+    )
+    recipes = list(Recipe.objects.order_by('id'))
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=100)
+        for recipe in recipes
+        for ingredient in rng.sample(ingredients, INGREDIENTS_PER_RECIPE)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe in recipes
+        for tag in rng.sample(tags, TAGS_PER_RECIPE)
+    )
+    for model, per_user in (
+        (Favorite, FAVORITES_PER_USER), (ShoppingCart, CARTS_PER_USER)
+    ):
+        model.objects.bulk_create(
+            model(user=user, recipe=recipe)
+            for user in users
+            for recipe in rng.sample(recipes, per_user)
+        )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author)
+        for user in users
+        for author in rng.sample(users, SUBSCRIPTIONS_PER_USER + 1)
+        if author != user
+    )
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        seed_database()
+        call_command('rebuild_counters')
+        call_command('rebuild_feed')
+        user = User.objects.get(username='user0')
+        user.set_password(PASSWORD)
+        user.save(update_fields=('password',))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.get(username='user0')
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    # Как после первого запроса: токен уже в кеше аутентификации.
+    CachedTokenAuthentication().authenticate_credentials(token.key)
+    return client
+
+
+@pytest.fixture
+def own_recipe(user):
+    return Recipe.objects.filter(author=user).first()
+
+
+@pytest.fixture
+def foreign_recipe(user):
+    return Recipe.objects.exclude(author=user).exclude(
+        favorite_users__user=user
+    ).exclude(shoppingcart_users__user=user).first()
+
+
+@pytest.fixture
+def image():
+    return IMAGE
+
+
+def percentile(samples, share):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * share))]
+
+
+@pytest.fixture(scope='session')
+def benchmark_report():
+    """Копит замеры за сессию и пишет сводку в JSON-отчет."""
+    report = {}
+    yield report
+    REPORT_PATH.write_text(
+        json.dumps(
+            {
+                'seed': {
+                    'users': USERS_COUNT,
+                    'recipes': RECIPES_COUNT,
+                    'rounds': ROUNDS,
+                },
+                'endpoints': {
+                    name: {
+                        'max_queries': entry['max_queries'],
+                        'queries': entry['queries'],
+                        'samples': len(entry['samples']),
+                        'p50_ms': round(
+                            statistics.median(entry['samples']), 3
+                        ),
+                        'p95_ms': round(
+                            percentile(entry['samples'], 0.95), 3
+                        ),
+                    }
+                    for name, entry in report.items()
+                },
+            },
+            ensure_ascii=False,
+            indent=2,
+            sort_keys=True
+        ),
+        encoding='utf-8'
+    )
+
+
+@pytest.fixture
+def measure(benchmark_report):
+    """
+    Выполняет запрос, проверяет лимит запросов к БД и копит задержки.
+
+    Повторные вызовы с одним именем дописывают замеры, поэтому пары
+    «добавить/удалить» можно гонять в цикле.
+    """
+    def request(name, max_queries, method, url, client, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            elapsed = time.perf_counter() - started
+        queries = len(context.captured_queries)
+        assert queries <= max_queries, (
+            f'{name}: {queries} запросов к БД при лимите {max_queries}:\n'
+            + '\n'.join(query['sql'] for query in context.captured_queries)
+        )
+        entry = benchmark_report.setdefault(
+            name, {'max_queries': max_queries, 'queries': 0, 'samples': []}
+        )
+        entry['queries'] = max(entry['queries'], queries)
+        entry['samples'].append(elapsed * 1000)
+        return response
+
+    return request
+
+
+@pytest.fixture
+def repeat(measure):
+    """Гоняет идемпотентный запрос ROUNDS раз и возвращает последний ответ."""
+    def request(*args, **kwargs):
+        for _ in range(ROUNDS):
+            response = measure(*args, **kwargs)
+        return response
+
+    return request
@@ -0,0 +1,32 @@
+"""Настройки для прогона тестов и бенчмарков на локальной SQLite."""
+import tempfile
+
+from foodgram.settings import *  # noqa: F401,F403
+from foodgram.settings import BASE_DIR, REST_FRAMEWORK
+
+DEBUG = False
+
+ALLOWED_HOSTS = ('*',)
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+PASSWORD_HASHERS = ('django.contrib.auth.hashers.MD5PasswordHasher',)
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram_media_')
+
+# Покрывающие индексы есть только в PostgreSQL, в SQLite они создаются
+# без неключевых колонок.
+SILENCED_SYSTEM_CHECKS = ('models.W040',)
+
+# Тесты идут в одном процессе, и кеш в памяти для них общий.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'api.authentication.CachedTokenAuthentication',
+    ),
+}
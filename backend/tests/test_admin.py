@@ -0,0 +1,40 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from rest_framework import status
+
+from core.paginators import EstimatedCountPaginator
+from recipes.models import Recipe
+
+User = get_user_model()
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def admin_client():
+    admin = User.objects.create_superuser(
+        email='admin@foodgram.ru', username='admin', password='admin',
+        first_name='Админ', last_name='Админов'
+    )
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+@pytest.mark.parametrize('name, url, max_queries', (
+    ('admin-recipes', '/admin/recipes/recipe/', 6),
+    ('admin-users', '/admin/users/user/', 4),
+    ('admin-favorites', '/admin/recipes/favorite/', 4),
+    ('admin-subscriptions', '/admin/users/subscription/', 4),
+    ('admin-recipe-ingredients', '/admin/recipes/recipeingredient/', 4),
+))
+def test_admin_changelist_queries(admin_client, repeat, name, url,
+                                  max_queries):
+    response = repeat(name, max_queries, 'get', url, admin_client)
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_estimated_count_paginator_falls_back_to_count():
+    paginator = EstimatedCountPaginator(Recipe.objects.order_by('id'), 100)
+    assert paginator.count == Recipe.objects.count()
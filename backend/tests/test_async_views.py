@@ -0,0 +1,98 @@
+"""Режим ASGI: асинхронные представления чтения и передача записей в DRF."""
+import asyncio
+from time import monotonic, sleep
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db.backends.utils import CursorWrapper
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, override_settings
+from django.urls import resolve
+from rest_framework import status
+
+from api.async_views import read_view
+from recipes.utils import encode_short_link_code
+
+pytestmark = pytest.mark.django_db
+
+ASGI_URLS = override_settings(ROOT_URLCONF='foodgram.asgi_urls')
+
+
+def count_queries():
+    """Запросы к БД из всех потоков, в том числе из пула sync_to_async."""
+    return mock.patch.object(
+        CursorWrapper, 'execute', autospec=True,
+        side_effect=CursorWrapper.execute
+    )
+
+
+def async_get(url, **extra):
+    async def get():
+        return await AsyncClient().get(url, **extra)
+
+    return async_to_sync(get)()
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/?limit=5&tags=tag0',
+    '/api/recipes/{recipe_id}/',
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/ingredients/?name=сол',
+))
+def test_async_reads_match_sync(client, foreign_recipe, url):
+    url = url.format(recipe_id=foreign_recipe.id)
+    expected = client.get(url)
+    assert client.get(url)['Vary'] == expected['Vary']
+    with ASGI_URLS:
+        assert asyncio.iscoroutinefunction(resolve(url.split('?')[0]).func)
+        for _ in range(2):
+            with count_queries() as execute:
+                response = async_get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json() == expected.json()
+            assert response['Vary'] == expected['Vary']
+    assert not execute.called
+
+
+def test_async_mode_passes_other_requests_to_drf(user_client, own_recipe):
+    url = f'/api/recipes/{own_recipe.id}/'
+    with ASGI_URLS:
+        response = user_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['author']['id'] == own_recipe.author_id
+        assert async_get(url, HTTP_ACCEPT='text/html').status_code == (
+            status.HTTP_200_OK
+        )
+        assert user_client.delete(url).status_code == (
+            status.HTTP_204_NO_CONTENT
+        )
+        assert async_get(url).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_async_short_link_redirect(foreign_recipe):
+    with ASGI_URLS:
+        code = encode_short_link_code(foreign_recipe.id)
+        response = async_get(f'/s/{code}/')
+        assert response.status_code == status.HTTP_302_FOUND
+        assert response['Location'] == f'/recipes/{foreign_recipe.id}/'
+        assert async_get('/s/missing/').status_code == (
+            status.HTTP_404_NOT_FOUND
+        )
+
+
+def test_async_reads_run_concurrently():
+    def slow_read(request):
+        sleep(0.2)
+        return HttpResponse()
+
+    view = read_view(lambda request: None, slow_read)
+    request = RequestFactory().get('/')
+
+    async def read_all():
+        started = monotonic()
+        await asyncio.gather(*(view(request) for _ in range(4)))
+        return monotonic() - started
+
+    assert async_to_sync(read_all)() < 0.6
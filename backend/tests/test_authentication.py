@@ -0,0 +1,125 @@
+"""Кеш аутентификации по токену: попадания, сброс, LRU и время жизни."""
+import runpy
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from api.authentication import CachedTokenAuthentication, TokenCache
+from foodgram import settings as project_settings
+from recipes.counters import change_counters
+
+from .conftest import IMAGE, PASSWORD
+
+pytestmark = pytest.mark.django_db
+
+
+def authenticate(key):
+    return CachedTokenAuthentication().authenticate_credentials(key)
+
+
+def token_client(key):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+    return client
+
+
+def test_cached_token_needs_no_queries(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    first_user, _ = authenticate(token.key)
+    with CaptureQueriesContext(connection) as context:
+        cached_user, cached_token = authenticate(token.key)
+    assert not context.captured_queries
+    assert cached_user == user
+    assert cached_token.key == token.key
+    assert cached_user is not first_user
+    assert cached_token.user is cached_user
+    with pytest.raises(AuthenticationFailed):
+        authenticate('0' * 40)
+
+
+def test_logout_invalidates_cached_token(client, user):
+    response = client.post(
+        '/api/auth/token/login/',
+        data={'email': user.email, 'password': PASSWORD},
+        format='json'
+    )
+    client = token_client(response.data['auth_token'])
+    assert client.get('/api/users/me/').status_code == status.HTTP_200_OK
+    assert client.post('/api/auth/token/logout/').status_code == (
+        status.HTTP_204_NO_CONTENT
+    )
+    assert client.get('/api/users/me/').status_code == (
+        status.HTTP_401_UNAUTHORIZED
+    )
+
+
+def test_token_deletion_and_deactivation_invalidate(user_client, user):
+    assert user_client.get('/api/users/me/').status_code == (
+        status.HTTP_200_OK
+    )
+    user.is_active = False
+    user.save(update_fields=('is_active',))
+    assert user_client.get('/api/users/me/').status_code == (
+        status.HTTP_401_UNAUTHORIZED
+    )
+    user.is_active = True
+    user.save(update_fields=('is_active',))
+    token = Token.objects.get(user=user)
+    assert token_client(token.key).get('/api/users/me/').status_code == (
+        status.HTTP_200_OK
+    )
+    token.delete()
+    assert token_client(token.key).get('/api/users/me/').status_code == (
+        status.HTTP_401_UNAUTHORIZED
+    )
+
+
+def test_cached_user_does_not_overwrite_counters(user_client, user):
+    change_counters(type(user), (user.id,), 5, 'recipes_count')
+    response = user_client.put(
+        '/api/users/me/avatar/', data={'avatar': IMAGE}, format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK
+    recipes_count = user.recipes_count + 5
+    user.refresh_from_db()
+    assert user.recipes_count == recipes_count
+    response = user_client.get('/api/users/me/')
+    assert response.data['avatar'].endswith(user.avatar.name.split('/')[-1])
+
+
+def test_token_cache_is_bounded_and_expires():
+    cache = TokenCache(max_size=2, timeout=60)
+    for key in 'abc':
+        cache.set(key, key, 'version')
+    assert cache.get('a') is None
+    assert cache.get('b')['token'] == 'b'
+    cache.set('d', 'd', 'version')
+    assert cache.get('c') is None
+    assert cache.get('b') is not None
+    cache = TokenCache(max_size=2, timeout=-1)
+    cache.set('a', 'a', 'version')
+    assert cache.get('a') is None
+
+
+@pytest.mark.parametrize('backend, authentication_class', (
+    (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'rest_framework.authentication.TokenAuthentication'
+    ),
+    (
+        'django.core.cache.backends.memcached.PyMemcacheCache',
+        'api.authentication.CachedTokenAuthentication'
+    ),
+))
+def test_token_cache_needs_shared_cache(monkeypatch, backend,
+                                        authentication_class):
+    monkeypatch.setenv('CACHE_BACKEND', backend)
+    settings = runpy.run_path(project_settings.__file__)
+    assert settings['REST_FRAMEWORK']['DEFAULT_AUTHENTICATION_CLASSES'] == (
+        authentication_class,
+    )
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+
+from api.shopping_cart import UNITS_VERSION_KEY
+from recipes.models import FeedEntry, Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+pytestmark = pytest.mark.django_db
+
+
+def test_load_ingredients_is_idempotent(tmp_path, client):
+    csv_path = tmp_path / 'ingredients.csv'
+    csv_path.write_text(
+        'шафран,г\nкардамон,г\nшафран,г\n', encoding='utf-8'
+    )
+    json_path = tmp_path / 'reference.json'
+    json_path.write_text(json.dumps([
+        {
+            'model': 'recipes.ingredient',
+            'pk': '1',
+            'fields': {'name': 'кардамон', 'measurement_unit': 'г'}
+        },
+        {
+            'model': 'recipes.tag',
+            'pk': '1',
+            'fields': {'name': 'Завтрак', 'slug': 'breakfast'}
+        },
+    ]), encoding='utf-8')
+    output = tmp_path / 'output.txt'
+    ingredients_count = Ingredient.objects.count()
+    tags_count = Tag.objects.count()
+    assert client.get('/api/ingredients/?name=шафран').data == []
+    for _ in range(2):
+        with open(output, 'w', encoding='utf-8') as stdout:
+            call_command(
+                'load_ingredients', str(csv_path), str(json_path),
+                batch_size=2, stdout=stdout
+            )
+        assert Ingredient.objects.count() == ingredients_count + 2
+        assert Tag.objects.count() == tags_count + 1
+    assert [
+        item['name']
+        for item in client.get('/api/ingredients/?name=шафран').data
+    ] == ['шафран']
+    assert 'строк/с' in output.read_text(encoding='utf-8')
+
+
+def test_load_ingredients_default_fixture(tmp_path):
+    with open(tmp_path / 'output.txt', 'w', encoding='utf-8') as stdout:
+        call_command('load_ingredients', stdout=stdout)
+    assert Ingredient.objects.filter(name='абрикосовое варенье').exists()
+
+
+def test_counters_follow_writes_and_rebuild(
+    user_client, user, foreign_recipe, tmp_path
+):
+    author = foreign_recipe.author
+    user_client.post(f'/api/recipes/{foreign_recipe.id}/favorite/')
+    user_client.post(f'/api/users/{author.id}/subscribe/')
+    user.refresh_from_db()
+    author.refresh_from_db()
+    foreign_recipe.refresh_from_db()
+    assert foreign_recipe.favorites_count == (
+        foreign_recipe.favorite_users.count()
+    )
+    assert user.favorite_recipes_count == user.favorite_recipes.count()
+    assert user.subscriptions_count == user.subscriptions.count()
+    assert author.subscribers_count == author.subscribed_by.count()
+    assert author.recipes_count == author.recipes.count()
+    expected = {
+        'recipe': foreign_recipe.favorites_count,
+        'author': author.subscribers_count,
+    }
+    Recipe.objects.update(favorites_count=0)
+    User.objects.update(subscribers_count=0, recipes_count=0)
+    with open(tmp_path / 'output.txt', 'w', encoding='utf-8') as stdout:
+        call_command('rebuild_counters', stdout=stdout)
+    foreign_recipe.refresh_from_db()
+    author.refresh_from_db()
+    assert foreign_recipe.favorites_count == expected['recipe']
+    assert author.subscribers_count == expected['author']
+    assert author.recipes_count == author.recipes.count()
+
+
+def test_explain_queries(tmp_path, user):
+    output = tmp_path / 'output.txt'
+    recipe = Recipe.objects.filter(author=user).first()
+    feed_size = FeedEntry.objects.count()
+    with open(output, 'w', encoding='utf-8') as stdout:
+        call_command('explain_queries', user=user.email, stdout=stdout)
+    report = output.read_text(encoding='utf-8')
+    for name in ('recipes-list:', 'recipes-detail:', 'subscriptions:',
+                 'download-shopping-cart:', 'recipes-search:'):
+        assert name in report
+    assert 'USING INDEX' in report
+    assert 'Запросов с полным просмотром таблиц:' in report
+    assert Recipe.objects.get(id=recipe.id).short_link_code == (
+        recipe.short_link_code
+    )
+    assert FeedEntry.objects.count() == feed_size
+    assert cache.get(UNITS_VERSION_KEY) is None
@@ -0,0 +1,1021 @@
+"""
+Регрессионные бенчмарки API: лимиты запросов к БД и задержки.
+
+Каждый тест проверяет, что эндпоинт укладывается в заданное число запросов
+к БД, а фикстура ``measure`` пишет p50/p95 задержек в JSON-отчет.
+"""
+import base64
+import json
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.catalog import tags_catalog
+from api.ingredient_index import INDEX_VERSION_KEY, ingredient_index
+from api.views import RecipeViewSet
+from core.constants import (INGREDIENT_SEARCH_LIMIT,
+                            RECIPE_SHORT_LINK_CODE_MAX_LENGTH,
+                            RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH)
+from core.fields import Base64ImageField
+from recipes.feed import pull_popular_authors
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag,
+                            UnitConversion)
+from recipes.utils import decode_short_link_code, encode_short_link_code
+from users.models import Subscription
+
+from .conftest import PASSWORD, ROUNDS
+
+User = get_user_model()
+DOES_NOT_EXIST = PrimaryKeyRelatedField.default_error_messages[
+    'does_not_exist'
+]
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/',
+    '/api/recipes/?tags=tag0&tags=tag1',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/users/',
+    '/api/users/subscriptions/',
+    '/api/users/subscriptions/?recipes_limit=2',
+    '/api/recipes/feed/',
+))
+def test_list_queries_do_not_grow_with_page_size(user_client, url):
+    counts = []
+    separator = '&' if '?' in url else '?'
+    for limit in (1, 50):
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(f'{url}{separator}limit={limit}')
+        assert response.status_code == status.HTTP_200_OK
+        counts.append(len(context.captured_queries))
+    assert counts[0] == counts[1], (
+        f'{url}: число запросов растет с размером страницы: {counts}'
+    )
+
+
+@pytest.mark.parametrize('name, url, max_queries', (
+    ('recipes-list-anonymous', '/api/recipes/?limit=50', 4),
+    ('recipes-list-tags-anonymous', '/api/recipes/?tags=tag0&tags=tag1', 4),
+    ('recipes-list-author-anonymous', '/api/recipes/?author=1', 5),
+    ('users-list-anonymous', '/api/users/?limit=50', 2),
+))
+def test_anonymous_reads(client, repeat, name, url, max_queries):
+    response = repeat(name, max_queries, 'get', url, client)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.parametrize('name, url, max_queries', (
+    ('recipes-list', '/api/recipes/?limit=50', 4),
+    ('recipes-list-cursor', '/api/recipes/?limit=50&cursor=', 3),
+    ('recipes-list-favorited', '/api/recipes/?is_favorited=1', 4),
+    ('recipes-list-in-cart', '/api/recipes/?is_in_shopping_cart=1', 4),
+    ('users-list', '/api/users/?limit=50', 2),
+    ('subscriptions-cursor', '/api/users/subscriptions/?cursor=', 2),
+    ('users-me', '/api/users/me/', 1),
+    ('feed', '/api/recipes/feed/?limit=50', 5),
+    ('subscriptions', '/api/users/subscriptions/?limit=50', 3),
+    (
+        'subscriptions-recipes-limit',
+        '/api/users/subscriptions/?recipes_limit=3',
+        3
+    ),
+))
+def test_authenticated_reads(user_client, repeat, name, url, max_queries):
+    response = repeat(name, max_queries, 'get', url, user_client)
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_recipe_detail(client, user_client, repeat, foreign_recipe):
+    url = reverse('api:recipes-detail', args=(foreign_recipe.id,))
+    assert repeat(
+        'recipes-detail-anonymous', 3, 'get', url, client
+    ).status_code == status.HTTP_200_OK
+    assert repeat(
+        'recipes-detail', 3, 'get', url, user_client
+    ).status_code == status.HTTP_200_OK
+
+
+def test_anonymous_recipe_cache(client, foreign_recipe):
+    list_url = '/api/recipes/?limit=50&author=' + str(
+        foreign_recipe.author_id
+    )
+    detail_url = reverse('api:recipes-detail', args=(foreign_recipe.id,))
+
+    def get(url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        return response.json(), len(context.captured_queries)
+
+    def find(data):
+        if 'results' in data:
+            return next(
+                recipe for recipe in data['results']
+                if recipe['id'] == foreign_recipe.id
+            )
+        return data
+
+    for url in (list_url, detail_url):
+        assert get(url)[1] > 0
+        assert get(url)[1] == 0
+    assert get(list_url.replace('limit=50&', '') + '&limit=50')[1] == 0
+    foreign_recipe.name = 'Переименованный рецепт'
+    foreign_recipe.save(update_fields=('name',))
+    author = foreign_recipe.author
+    author.first_name = 'Переименованный'
+    author.save(update_fields=('first_name',))
+    tag = foreign_recipe.tags.first()
+    tag.name = 'Переименованный тег'
+    tag.save()
+    ingredient = foreign_recipe.ingredients.first()
+    ingredient.name = 'Переименованный ингредиент'
+    ingredient.save()
+    for url in (list_url, detail_url):
+        data, queries = get(url)
+        recipe = find(data)
+        assert queries > 0
+        assert recipe['name'] == foreign_recipe.name
+        assert recipe['author']['first_name'] == author.first_name
+        assert tag.name in [item['name'] for item in recipe['tags']]
+        assert ingredient.name in [
+            item['name'] for item in recipe['ingredients']
+        ]
+
+
+def test_tag_and_ingredient_detail(client, repeat):
+    tag = Tag.objects.first()
+    ingredient = Ingredient.objects.first()
+    assert repeat(
+        'tags-detail', 1, 'get',
+        reverse('api:tags-detail', args=(tag.id,)), client
+    ).status_code == status.HTTP_200_OK
+    assert repeat(
+        'ingredients-detail', 1, 'get',
+        reverse('api:ingredients-detail', args=(ingredient.id,)), client
+    ).status_code == status.HTTP_200_OK
+
+
+def test_user_detail(client, user_client, repeat, user):
+    author = User.objects.exclude(id=user.id).first()
+    url = reverse('api:users-detail', args=(author.id,))
+    assert repeat(
+        'users-detail-anonymous', 1, 'get', url, client
+    ).status_code == status.HTTP_200_OK
+    assert repeat(
+        'users-detail', 1, 'get', url, user_client
+    ).status_code == status.HTTP_200_OK
+
+
+def test_recipe_create_update_delete(user_client, measure, image, user):
+    tags = list(Tag.objects.values_list('id', flat=True)[:2])
+    ingredients = [
+        {'id': ingredient_id, 'amount': 10}
+        for ingredient_id in Ingredient.objects.values_list(
+            'id', flat=True
+        )[:30]
+    ]
+    updated_ingredients = [
+        {'id': ingredient['id'], 'amount': 20}
+        for ingredient in ingredients[:5]
+    ] + ingredients[10:] + [
+        {'id': ingredient_id, 'amount': 10}
+        for ingredient_id in Ingredient.objects.values_list(
+            'id', flat=True
+        )[30:35]
+    ]
+    for number in range(ROUNDS):
+        response = measure(
+            'recipes-create', 17, 'post', '/api/recipes/', user_client,
+            data={
+                'name': f'Новый рецепт {number}',
+                'text': 'Описание.',
+                'cooking_time': 10,
+                'image': image,
+                'tags': tags,
+                'ingredients': ingredients,
+            },
+            format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED, (
+            response.data
+        )
+        url = reverse('api:recipes-detail', args=(response.data['id'],))
+        response = measure(
+            'recipes-partial-update', 20, 'patch', url, user_client,
+            data={
+                'text': 'Новое описание.',
+                'image': image,
+                'tags': tags[:1],
+                'ingredients': updated_ingredients,
+            },
+            format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK, response.data
+        assert sorted(
+            (ingredient['id'], ingredient['amount'])
+            for ingredient in response.data['ingredients']
+        ) == sorted(
+            (ingredient['id'], ingredient['amount'])
+            for ingredient in updated_ingredients
+        )
+        response = measure(
+            'recipes-destroy', 10, 'delete', url, user_client
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.parametrize('method, url', (
+    ('get', '/api/recipes/abc/'),
+    ('post', '/api/recipes/abc/favorite/'),
+    ('delete', '/api/recipes/abc/shopping_cart/'),
+    ('post', '/api/users/abc/subscribe/'),
+    ('delete', '/api/users/abc/subscribe/'),
+))
+def test_non_numeric_id_is_not_found(client, user_client, method, url):
+    for api_client in (client, user_client):
+        assert getattr(api_client, method)(url).status_code in (
+            status.HTTP_401_UNAUTHORIZED, status.HTTP_404_NOT_FOUND
+        )
+    assert getattr(user_client, method)(url).status_code == (
+        status.HTTP_404_NOT_FOUND
+    )
+
+
+def test_recipe_retrieve_turns_bad_pk_into_not_found():
+    view = RecipeViewSet.as_view({'get': 'retrieve'})
+    response = view(APIRequestFactory().get('/'), pk='abc')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize('field, value, errors', (
+    ('tags', [0], [DOES_NOT_EXIST.format(pk_value=0)]),
+    (
+        'ingredients',
+        [{'id': 1, 'amount': 10}, {'id': 0, 'amount': 10}],
+        [{}, {'id': [DOES_NOT_EXIST.format(pk_value=0)]}]
+    ),
+))
+def test_recipe_update_rejects_unknown_ids(user_client, own_recipe, image,
+                                           field, value, errors):
+    ingredients = list(own_recipe.recipe_ingredients.values_list(
+        'ingredient_id', 'amount'
+    ))
+    data = {
+        'text': 'Новое описание.',
+        'image': image,
+        'tags': list(own_recipe.tags.values_list('id', flat=True)),
+        'ingredients': [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in ingredients
+        ],
+        field: value,
+    }
+    response = user_client.patch(
+        f'/api/recipes/{own_recipe.id}/', data=data, format='json'
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()[field] == errors
+    assert list(own_recipe.recipe_ingredients.values_list(
+        'ingredient_id', 'amount'
+    )) == ingredients
+
+
+def test_combined_filters_use_exists_without_distinct(user_client, user):
+    for recipe in Recipe.objects.filter(tags__slug='tag0')[:3]:
+        Favorite.objects.get_or_create(user=user, recipe=recipe)
+        ShoppingCart.objects.get_or_create(user=user, recipe=recipe)
+    url = (
+        '/api/recipes/?tags=tag0&tags=tag1&is_favorited=1'
+        '&is_in_shopping_cart=1&limit=100'
+    )
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert not any(
+        'DISTINCT' in query['sql'] for query in context.captured_queries
+    )
+    expected = set(Recipe.objects.filter(
+        tags__slug__in=('tag0', 'tag1'),
+        favorite_users__user=user,
+        shoppingcart_users__user=user
+    ).values_list('id', flat=True))
+    assert len(expected) >= 3
+    assert {
+        recipe['id'] for recipe in response.data['results']
+    } == expected
+    assert response.data['count'] == len(expected)
+
+
+def test_recipe_search(client, user_client, repeat, own_recipe):
+    own_recipe.name = 'Борщ украинский'
+    own_recipe.text = 'Наваристый суп со свеклой и сметаной.'
+    own_recipe.save(update_fields=('name', 'text'))
+    other_recipe = Recipe.objects.exclude(id=own_recipe.id).first()
+    other_recipe.text = 'Подавать как борщ.'
+    other_recipe.save(update_fields=('text',))
+    response = repeat(
+        'recipes-search', 4, 'get', '/api/recipes/?search=БОРЩ', user_client
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        own_recipe.id, other_recipe.id
+    ]
+    response = client.get('/api/recipes/?search=свекл')
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        own_recipe.id
+    ]
+    assert client.get(
+        '/api/recipes/?search="OR*'
+    ).status_code == status.HTTP_200_OK
+    own_recipe.delete()
+    assert client.get('/api/recipes/?search=свекл').json()['count'] == 0
+
+
+def test_short_link(client, user_client, repeat, measure, foreign_recipe):
+    foreign_recipe.short_link_code = None
+    foreign_recipe.save(update_fields=('short_link_code',))
+    url = reverse('api:recipes-get-short-link', args=(foreign_recipe.id,))
+    measure('recipes-get-link-generate', 2, 'get', url, user_client)
+    response = repeat('recipes-get-link', 1, 'get', url, user_client)
+    assert response.status_code == status.HTTP_200_OK
+    code = response.data['short-link'].rstrip('/').rsplit('/', 1)[-1]
+    assert len(code) > RECIPE_SHORT_LINK_LEGACY_CODE_LENGTH
+    response = repeat('short-link-redirect', 1, 'get', f'/s/{code}/', client)
+    assert response.status_code == status.HTTP_302_FOUND
+    assert response['Location'] == f'/recipes/{foreign_recipe.id}/'
+
+
+def test_short_link_codes_are_unique_and_reversible():
+    codes = {encode_short_link_code(recipe_id) for recipe_id in range(10000)}
+    assert len(codes) == 10000
+    assert all(
+        decode_short_link_code(encode_short_link_code(recipe_id)) == recipe_id
+        for recipe_id in (1, 35, 36, 46655, 10 ** 12)
+    )
+
+
+def test_legacy_short_link_still_redirects(client):
+    recipe = Recipe.objects.exclude(short_link_code=None).first()
+    response = client.get(f'/s/{recipe.short_link_code}/')
+    assert response.status_code == status.HTTP_302_FOUND
+    assert response['Location'] == f'/recipes/{recipe.id}/'
+    assert client.get('/s/zzzz/').status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_non_canonical_short_links_are_not_found(client, foreign_recipe):
+    code = encode_short_link_code(foreign_recipe.id)
+    assert client.get(f'/s/{code}/').status_code == status.HTTP_302_FOUND
+    for bad_code in (
+        code.upper(), f'0{code}', f'{code[:2]}_{code[2:]}', 'z' * 22,
+        'z' * RECIPE_SHORT_LINK_CODE_MAX_LENGTH
+    ):
+        assert decode_short_link_code(bad_code) is None
+        assert client.get(f'/s/{bad_code}/').status_code == (
+            status.HTTP_404_NOT_FOUND
+        )
+
+
+@pytest.mark.parametrize('name, model, add_queries, remove_queries', (
+    ('favorite', Favorite, 6, 3),
+    ('shopping_cart', ShoppingCart, 4, 1),
+))
+def test_favorite_and_cart_toggle(user_client, measure, foreign_recipe,
+                                  user, name, model, add_queries,
+                                  remove_queries):
+    url = f'/api/recipes/{foreign_recipe.id}/{name}/'
+    for _ in range(ROUNDS):
+        response = measure(
+            f'{name}-add', add_queries, 'post', url, user_client
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert model.objects.filter(
+            user=user, recipe=foreign_recipe
+        ).exists()
+        response = measure(
+            f'{name}-remove', remove_queries, 'delete', url, user_client
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = user_client.delete(url)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize('name, model', (
+    ('favorite', Favorite),
+    ('shopping_cart', ShoppingCart),
+))
+def test_repeated_add_is_rejected_by_constraint(user_client, foreign_recipe,
+                                                user, name, model):
+    url = f'/api/recipes/{foreign_recipe.id}/{name}/'
+    assert user_client.post(url).status_code == status.HTTP_201_CREATED
+    response = user_client.post(url)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['non_field_errors'] == ['Рецепт уже добавлен.']
+    assert model.objects.filter(user=user, recipe=foreign_recipe).count() == 1
+    foreign_recipe.refresh_from_db()
+    assert foreign_recipe.favorites_count == (
+        foreign_recipe.favorite_users.count()
+    )
+    assert user_client.delete(
+        f'/api/recipes/{foreign_recipe.id + 10 ** 6}/{name}/'
+    ).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize('model', (Favorite, ShoppingCart))
+def test_add_recipe_does_not_hide_other_violations(user, model):
+    missing_id = Recipe.objects.order_by('-id').first().id + 1
+    with pytest.raises(IntegrityError), transaction.atomic():
+        model.add_recipe(user, missing_id)
+        connection.check_constraints(table_names=[model._meta.db_table])
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Subscription.subscribe(user, user)
+
+
+@pytest.mark.parametrize('name, model', (
+    ('favorite', Favorite),
+    ('shopping_cart', ShoppingCart),
+))
+def test_batch_favorite_and_cart(user_client, measure, user, name, model):
+    owned = list(model.objects.filter(user=user).values_list(
+        'recipe_id', flat=True
+    )[:2])
+    new = list(Recipe.objects.exclude(**{
+        f'{model._meta.model_name}_users__user': user
+    }).values_list('id', flat=True)[:20])
+    missing_id = Recipe.objects.order_by('-id').first().id + 1
+    url = f'/api/recipes/{name}/'
+    response = measure(
+        f'{name}-batch-add', 4, 'post', url, user_client,
+        data={'recipes': new + owned + [missing_id, new[0]]}, format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK, response.data
+    assert response.data == (
+        [{'id': recipe_id, 'status': 'added'} for recipe_id in new]
+        + [{'id': recipe_id, 'status': 'exists'} for recipe_id in owned]
+        + [{'id': missing_id, 'status': 'not_found'}]
+    )
+    assert model.objects.filter(user=user, recipe_id__in=new).count() == 20
+    response = measure(
+        f'{name}-batch-remove', 3, 'delete', url, user_client,
+        data={'recipes': new + [missing_id]}, format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK, response.data
+    assert response.data == (
+        [{'id': recipe_id, 'status': 'removed'} for recipe_id in new]
+        + [{'id': missing_id, 'status': 'missing'}]
+    )
+    assert not model.objects.filter(user=user, recipe_id__in=new).exists()
+    assert user_client.post(
+        url, data={'recipes': []}, format='json'
+    ).status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_batch_favorite_keeps_counters(user_client, user):
+    recipe_ids = list(Recipe.objects.exclude(
+        favorite_users__user=user
+    ).values_list('id', flat=True)[:3])
+    user_client.post(
+        '/api/recipes/favorite/', data={'recipes': recipe_ids}, format='json'
+    )
+    user.refresh_from_db()
+    assert user.favorite_recipes_count == user.favorite_recipes.count()
+    for recipe in Recipe.objects.filter(id__in=recipe_ids):
+        assert recipe.favorites_count == recipe.favorite_users.count()
+    user_client.delete(
+        '/api/recipes/favorite/', data={'recipes': recipe_ids}, format='json'
+    )
+    user.refresh_from_db()
+    assert user.favorite_recipes_count == user.favorite_recipes.count()
+    for recipe in Recipe.objects.filter(id__in=recipe_ids):
+        assert recipe.favorites_count == recipe.favorite_users.count()
+
+
+def test_instance_save_keeps_counters(user, foreign_recipe):
+    """Сохранение загруженного объекта не затирает счетчики."""
+    favorites_count = foreign_recipe.favorites_count
+    favorite_recipes_count = user.favorite_recipes_count
+    Favorite.add_recipe(user, foreign_recipe.id)
+    foreign_recipe.cooking_time += 1
+    foreign_recipe.save()
+    user.first_name = 'Новое имя'
+    user.save()
+    foreign_recipe.refresh_from_db()
+    user.refresh_from_db()
+    assert foreign_recipe.favorites_count == favorites_count + 1
+    assert user.favorite_recipes_count == favorite_recipes_count + 1
+
+
+@pytest.mark.parametrize('can_return_rows', (True, False))
+def test_batch_counters_follow_actual_writes(user, can_return_rows):
+    """Строки, которые добавил или удалил параллельный запрос, не в счет."""
+    recipe_ids = list(Recipe.objects.exclude(
+        favorite_users__user=user
+    ).values_list('id', flat=True)[:3])
+
+    def assert_counters():
+        user.refresh_from_db()
+        assert user.favorite_recipes_count == user.favorite_recipes.count()
+        for recipe in Recipe.objects.filter(id__in=recipe_ids):
+            assert recipe.favorites_count == recipe.favorite_users.count()
+
+    with mock.patch('core.db.can_return_rows', return_value=can_return_rows):
+        Favorite.add_recipe(user, recipe_ids[0])
+        assert Favorite.add_recipes(user, recipe_ids) == recipe_ids[1:]
+        assert_counters()
+        Favorite.remove_recipe(user, recipe_ids[1])
+        assert sorted(Favorite.remove_recipes(user, recipe_ids)) == sorted(
+            (recipe_ids[0], recipe_ids[2])
+        )
+        assert_counters()
+
+
+def test_download_shopping_cart(user_client, repeat):
+    response = repeat(
+        'download-shopping-cart', 2, 'get',
+        '/api/recipes/download_shopping_cart/', user_client
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_subscribe_toggle(user_client, measure, user):
+    author = User.objects.exclude(
+        id=user.id
+    ).exclude(subscribed_by__user=user).first()
+    url = f'/api/users/{author.id}/subscribe/?recipes_limit=3'
+    for _ in range(ROUNDS):
+        response = measure('subscribe', 8, 'post', url, user_client)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['is_subscribed']
+        assert response.data['recipes_count'] == author.recipes.count()
+        assert [recipe['id'] for recipe in response.data['recipes']] == list(
+            author.recipes.values_list('id', flat=True)[:3]
+        )
+        response = measure('unsubscribe', 4, 'delete', url, user_client)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert not Subscription.objects.filter(user=user, author=author).exists()
+    assert user_client.delete(url).status_code == (
+        status.HTTP_400_BAD_REQUEST
+    )
+    assert user_client.post(url).status_code == status.HTTP_201_CREATED
+    response = user_client.post(url)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['non_field_errors'] == [
+        'Вы уже подписаны на этого автора.'
+    ]
+    response = user_client.post(f'/api/users/{user.id}/subscribe/')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['non_field_errors'] == [
+        'Нельзя подписаться на самого себя.'
+    ]
+    author.refresh_from_db()
+    assert author.subscribers_count == author.subscribed_by.count()
+
+
+def test_feed_follows_subscriptions(user_client, user):
+    author = User.objects.exclude(
+        id=user.id
+    ).exclude(subscribed_by__user=user).first()
+    url = f'/api/users/{author.id}/subscribe/'
+
+    def feed_ids():
+        response = user_client.get('/api/recipes/feed/?limit=100')
+        assert response.status_code == status.HTTP_200_OK
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def publish(name):
+        return Recipe.objects.create(
+            author=author,
+            name=name,
+            text='Описание.',
+            cooking_time=10,
+            image='recipe_images/temp.png'
+        )
+
+    assert user_client.post(url).status_code == status.HTTP_201_CREATED
+    assert set(author.recipes.values_list('id', flat=True)) == set(
+        FeedEntry.objects.filter(
+            user=user, author=author
+        ).values_list('recipe_id', flat=True)
+    )
+    assert publish('Новинка').id == feed_ids()[0]
+    with mock.patch('recipes.feed.FEED_FANOUT_MAX_SUBSCRIBERS', 0):
+        recipe = publish('Новинка популярного автора')
+        assert not FeedEntry.objects.filter(user=user, recipe=recipe).exists()
+        assert pull_popular_authors(user.id)
+        assert not pull_popular_authors(user.id)
+        assert feed_ids()[0] == recipe.id
+    assert user_client.delete(url).status_code == (
+        status.HTTP_204_NO_CONTENT
+    )
+    assert not FeedEntry.objects.filter(user=user, author=author).exists()
+    assert user_client.get('/api/recipes/feed/').status_code == (
+        status.HTTP_200_OK
+    )
+
+
+def test_feed_keeps_recipes_published_above_fanout_threshold(user_client,
+                                                             user):
+    author = User.objects.exclude(
+        id=user.id
+    ).exclude(subscribed_by__user=user).first()
+    Subscription.subscribe(user, author)
+    with mock.patch('recipes.feed.FEED_FANOUT_MAX_SUBSCRIBERS', 0):
+        recipe = Recipe.objects.create(
+            author=author,
+            name='Рецепт популярного автора',
+            text='Описание.',
+            cooking_time=10,
+            image='recipe_images/temp.png'
+        )
+    assert not recipe.fanned_out
+    assert not FeedEntry.objects.filter(user=user, recipe=recipe).exists()
+    response = user_client.get('/api/recipes/feed/')
+    assert response.data['results'][0]['id'] == recipe.id
+    assert not pull_popular_authors(user.id)
+
+
+def test_avatar(user_client, measure, image):
+    for _ in range(ROUNDS):
+        response = measure(
+            'avatar-update', 3, 'put', '/api/users/me/avatar/', user_client,
+            data={'avatar': image}, format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = measure(
+            'avatar-delete', 4, 'delete', '/api/users/me/avatar/',
+            user_client
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.parametrize('avatar', (
+    'data:image/png;base64,' + base64.b64encode(b'not an image').decode(),
+    'data:image/png;base64,!!!!',
+))
+def test_invalid_base64_image_rejected(user_client, avatar):
+    response = user_client.put(
+        '/api/users/me/avatar/', data={'avatar': avatar}, format='json'
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_oversized_image_rejected_before_decoding(
+    user_client, image, monkeypatch
+):
+    monkeypatch.setattr(Base64ImageField, 'max_size', 32)
+    with mock.patch('core.fields.base64.b64decode') as b64decode:
+        response = user_client.put(
+            '/api/users/me/avatar/', data={'avatar': image}, format='json'
+        )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not b64decode.called
+
+
+def test_multipart_image_upload(user_client, image, user):
+    content = base64.b64decode(image.partition(';base64,')[2])
+    response = user_client.put(
+        '/api/users/me/avatar/',
+        data={'avatar': SimpleUploadedFile('avatar.png', content)},
+        format='multipart'
+    )
+    assert response.status_code == status.HTTP_200_OK, response.data
+    response = user_client.post(
+        '/api/recipes/',
+        data={
+            'name': 'Рецепт из формы',
+            'text': 'Описание.',
+            'cooking_time': 10,
+            'image': SimpleUploadedFile('recipe.png', content),
+            'tags': json.dumps(
+                list(Tag.objects.values_list('id', flat=True)[:1])
+            ),
+            'ingredients': json.dumps([
+                {'id': Ingredient.objects.values_list('id', flat=True)[0],
+                 'amount': 5}
+            ]),
+        },
+        format='multipart'
+    )
+    assert response.status_code == status.HTTP_201_CREATED, response.data
+    assert Recipe.objects.get(id=response.data['id']).image
+
+
+def test_user_create(client, measure):
+    for number in range(ROUNDS):
+        response = measure(
+            'users-create', 5, 'post', '/api/users/', client,
+            data={
+                'email': f'new{number}@foodgram.ru',
+                'username': f'new{number}',
+                'first_name': 'Новый',
+                'last_name': 'Пользователь',
+                'password': PASSWORD,
+            },
+            format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED, (
+            response.data
+        )
+
+
+def test_set_password(user_client, measure):
+    for _ in range(ROUNDS):
+        response = measure(
+            'users-set-password', 3, 'post', '/api/users/set_password/',
+            user_client,
+            data={'current_password': PASSWORD, 'new_password': PASSWORD},
+            format='json'
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT, (
+            response.data
+        )
+
+
+def test_token_login_logout(client, measure, user):
+    for _ in range(ROUNDS):
+        response = measure(
+            'token-login', 6, 'post', '/api/auth/token/login/', client,
+            data={'email': user.email, 'password': PASSWORD}, format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK, response.data
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {response.data["auth_token"]}'
+        )
+        response = measure(
+            'token-logout', 3, 'post', '/api/auth/token/logout/', client
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        client.credentials()
+
+
+@pytest.mark.parametrize('file_format, content_type', (
+    ('pdf', 'application/pdf'),
+    ('txt', 'text/plain; charset=utf-8'),
+    ('csv', 'text/csv; charset=utf-8'),
+))
+def test_download_shopping_cart_formats(user_client, measure, user,
+                                        foreign_recipe, file_format,
+                                        content_type):
+    url = f'/api/recipes/download_shopping_cart/?format={file_format}'
+    response = measure(
+        f'download-shopping-cart-{file_format}', 2, 'get', url, user_client
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == content_type
+    assert response['Content-Disposition'] == (
+        f'attachment; filename="shopping_cart.{file_format}"'
+    )
+    response = measure(
+        f'download-shopping-cart-{file_format}-cached', 1, 'get', url,
+        user_client
+    )
+    assert response.status_code == status.HTTP_200_OK
+    if file_format != 'pdf':
+        assert foreign_recipe.name not in response.content.decode()
+        ingredient = foreign_recipe.recipe_ingredients.first().ingredient
+        assert ingredient.name not in response.content.decode()
+        ShoppingCart.objects.create(user=user, recipe=foreign_recipe)
+        response = user_client.get(url)
+        assert ingredient.name in response.content.decode()
+        ingredient.name = 'переименованный ингредиент'
+        ingredient.save()
+        response = user_client.get(url)
+        assert ingredient.name in response.content.decode()
+
+
+def test_shopping_list_normalises_units(user_client, measure, user):
+    ShoppingCart.objects.filter(user=user).delete()
+    grams, kilograms = (
+        Ingredient.objects.create(name='сахар-песок', measurement_unit=unit)
+        for unit in ('г', 'кг')
+    )
+    for recipe, ingredient, amount in zip(
+        Recipe.objects.exclude(author=user)[:2],
+        (grams, kilograms),
+        (500, 2)
+    ):
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=amount
+        )
+        ShoppingCart.add_recipe(user, recipe.id)
+    response = measure(
+        'shopping-list', 2, 'get', '/api/recipes/shopping_list/', user_client
+    )
+    assert response.status_code == status.HTTP_200_OK
+    items = response.json()
+    assert {
+        'name': 'сахар-песок', 'measurement_unit': 'г', 'total_amount': 2500
+    } in items
+    assert items == sorted(
+        items, key=lambda item: (item['name'], item['measurement_unit'])
+    )
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/?format=txt'
+    )
+    assert '- сахар-песок — 2500 г' in response.content.decode()
+    UnitConversion.objects.filter(unit='кг').delete()
+    items = user_client.get('/api/recipes/shopping_list/').json()
+    assert [
+        (item['total_amount'], item['measurement_unit'])
+        for item in items if item['name'] == 'сахар-песок'
+    ] == [(500, 'г'), (2, 'кг')]
+    assert user_client.logout() is None
+    assert APIClient().get('/api/recipes/shopping_list/').status_code == (
+        status.HTTP_401_UNAUTHORIZED
+    )
+
+
+def test_shopping_cart_version_is_reset_on_commit(
+    user_client, user, django_capture_on_commit_callbacks
+):
+    """Список, отрисованный другим процессом до фиксации, не переживет ее."""
+    url = '/api/recipes/shopping_list/'
+    stale = user_client.get(url).json()
+    recipe_ingredient = RecipeIngredient.objects.filter(
+        recipe__shoppingcart_users__user=user
+    ).select_related('ingredient').first()
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe_ingredient.amount += 1000
+        recipe_ingredient.save()
+        with mock.patch(
+            'api.shopping_cart.get_ingredients_summary', return_value=stale
+        ):
+            assert user_client.get(url).json() == stale
+    assert user_client.get(url).json() != stale
+
+
+def test_download_shopping_cart_requires_auth(client):
+    response = client.get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response['Content-Type'] == 'application/json'
+
+
+def test_catalog_is_reset_on_commit(
+    client, django_capture_on_commit_callbacks
+):
+    """Справочник, собранный до фиксации, не переживет ее."""
+    stale = tags_catalog._load()
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name='Новый тег', slug='new-tag')
+        cache.add(
+            tags_catalog.state_key, {'version': 'stale', 'modified': 0}, None
+        )
+        tags_catalog._entry = {
+            **stale, 'version': cache.get(tags_catalog.state_key)['version']
+        }
+    response = client.get('/api/tags/')
+    assert 'new-tag' in [tag['slug'] for tag in response.json()]
+
+
+def test_ingredient_index_is_reset_on_commit(
+    client, django_capture_on_commit_callbacks
+):
+    """Индекс, собранный другим процессом до фиксации, не переживет ее."""
+    stale = ingredient_index._load()
+    with django_capture_on_commit_callbacks(execute=True):
+        Ingredient.objects.create(name='фейхоа', measurement_unit='г')
+        cache.add(INDEX_VERSION_KEY, 'stale', None)
+        ingredient_index._index = ('stale', *stale)
+    response = client.get('/api/ingredients/?name=фейхоа')
+    assert [item['name'] for item in response.data] == ['фейхоа']
+
+
+def test_ingredient_search_is_served_from_memory(client, repeat):
+    url = '/api/ingredients/?name=ингредиент 1'
+    client.get(url)
+    response = repeat('ingredients-search', 0, 'get', url, client)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data[0]['name'] == 'ингредиент 1'
+
+
+def test_ingredient_search_ranks_prefix_first(client):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='г')
+        for name in ('ванильный сахар', 'сахарная пудра', 'Сахар', 'мёд')
+    )
+    response = client.get('/api/ingredients/?name=сах')
+    assert [item['name'] for item in response.data] == [
+        'Сахар', 'сахарная пудра', 'ванильный сахар'
+    ]
+    response = client.get('/api/ingredients/?name=МЕД')
+    assert [item['name'] for item in response.data] == ['мёд']
+    response = client.get('/api/ingredients/?name=ингредиент')
+    assert len(response.data) == INGREDIENT_SEARCH_LIMIT
+
+
+def test_ingredient_search_sees_changes(client):
+    assert client.get('/api/ingredients/?name=шафран').data == []
+    ingredient = Ingredient.objects.create(
+        name='шафран', measurement_unit='г'
+    )
+    assert client.get('/api/ingredients/?name=шафран').data == [
+        {'id': ingredient.id, 'name': 'шафран', 'measurement_unit': 'г'}
+    ]
+    ingredient.delete()
+    assert client.get('/api/ingredients/?name=шафран').data == []
+
+
+@pytest.mark.parametrize('name, url, model', (
+    ('tags-list', '/api/tags/', Tag),
+    ('ingredients-list', '/api/ingredients/', Ingredient),
+))
+def test_catalog_is_served_from_memory(client, repeat, name, url, model):
+    response = client.get(url)
+    assert len(response.json()) == model.objects.count()
+    etag = response['ETag']
+    assert response['Cache-Control']
+    assert response['Last-Modified']
+    response = repeat(name, 0, 'get', url, client)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] == etag
+    response = repeat(
+        f'{name}-not-modified', 0, 'get', url, client, HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not response.content
+    instance = model.objects.first()
+    instance.name = 'новое название'
+    instance.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
+    assert 'новое название' in response.content.decode()
+
+
+def test_subscriptions_limit_recipes_per_author(user_client, user):
+    response = user_client.get(
+        '/api/users/subscriptions/?recipes_limit=2&limit=50'
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == Subscription.objects.filter(
+        user=user
+    ).count()
+    for author in response.data['results']:
+        recipes = Recipe.objects.filter(author_id=author['id'])
+        assert author['is_subscribed']
+        assert author['recipes_count'] == recipes.count()
+        assert [recipe['id'] for recipe in author['recipes']] == list(
+            recipes.values_list('id', flat=True)[:2]
+        )
+
+
+@pytest.mark.parametrize('url, expected', (
+    (
+        '/api/recipes/?limit=300&cursor=',
+        lambda user: Recipe.objects.order_by('-created_at', '-id')
+    ),
+    (
+        '/api/users/subscriptions/?limit=4&cursor=',
+        lambda user: User.objects.filter(
+            subscribed_by__user=user
+        ).order_by('username', 'id')
+    ),
+    (
+        '/api/recipes/feed/?limit=7',
+        lambda user: Recipe.objects.filter(
+            author__subscribed_by__user=user
+        ).order_by('-created_at', '-id')
+    ),
+))
+def test_cursor_pagination_walks_both_ways(user_client, user, url, expected):
+    expected_ids = list(expected(user).values_list('id', flat=True))
+    pages = []
+    while url:
+        response = user_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        pages.append([item['id'] for item in response.data['results']])
+        url = response.data['next']
+    assert sum(pages, []) == expected_ids
+    url = response.data['previous']
+    for page in reversed(pages[:-1]):
+        response = user_client.get(url)
+        assert [item['id'] for item in response.data['results']] == page
+        url = response.data['previous']
+    assert url is None
+
+
+def test_cursor_pagination_rejects_broken_cursor(client):
+    response = client.get('/api/recipes/?cursor=broken')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_cursor_pagination_rejects_search(client):
+    response = client.get('/api/recipes/?search=борщ&cursor=')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'cursor' in response.data
+    assert client.get('/api/recipes/?search=&cursor=').status_code == (
+        status.HTTP_200_OK
+    )
@@ -0,0 +1,116 @@
+"""Очередь фоновых задач: воркер, повторы, аренда и статус в API."""
+from datetime import timedelta
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from jobs.queue import claim_job, run_job, task
+from recipes.tasks import delete_files
+
+pytestmark = pytest.mark.django_db
+
+
+@task(max_attempts=2)
+def broken(job):
+    raise ValueError('Сломалось.')
+
+
+@pytest.mark.parametrize('file_format', ('pdf', 'txt'))
+def test_download_shopping_cart_in_background(user_client, user,
+                                              file_format):
+    url = f'/api/recipes/download_shopping_cart/?format={file_format}'
+    response = user_client.get(url, HTTP_PREFER='respond-async, wait=0')
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response['Preference-Applied'] == 'respond-async'
+    job_url = response['Location']
+    assert job_url == f'/api/jobs/{response.json()["id"]}/'
+    assert response.json()['status'] == Job.Status.PENDING
+    call_command('run_jobs', '--once')
+    response = user_client.get(job_url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['status'] == Job.Status.DONE
+    assert response.data['file'].startswith('http://testserver/media/jobs/')
+    job = Job.objects.get(id=response.data['id'])
+    with job.file.open('rb') as file:
+        content = file.read()
+    if file_format == 'txt':
+        assert content == user_client.get(url).content
+    else:
+        assert content.startswith(b'%PDF')
+    name = job.file.name
+    job.delete()
+    assert not default_storage.exists(name)
+
+
+def test_job_status_is_private(user_client, user):
+    job = broken.enqueue(user=user)
+    assert user_client.get(f'/api/jobs/{job.id}/').status_code == (
+        status.HTTP_200_OK
+    )
+    other_user = type(user).objects.exclude(id=user.id).first()
+    client = APIClient()
+    assert client.get(f'/api/jobs/{job.id}/').status_code == (
+        status.HTTP_401_UNAUTHORIZED
+    )
+    client.force_authenticate(other_user)
+    assert client.get(f'/api/jobs/{job.id}/').status_code == (
+        status.HTTP_404_NOT_FOUND
+    )
+    assert user_client.get('/api/jobs/not-a-uuid/').status_code == (
+        status.HTTP_404_NOT_FOUND
+    )
+
+
+def test_failed_job_is_retried_with_delay():
+    job = broken.enqueue()
+    run_job(claim_job())
+    job.refresh_from_db()
+    assert job.status == Job.Status.PENDING
+    assert job.attempts == 1
+    assert job.error == 'ValueError: Сломалось.'
+    assert job.run_after > timezone.now()
+    assert claim_job() is None
+    Job.objects.filter(id=job.id).update(run_after=timezone.now())
+    run_job(claim_job())
+    job.refresh_from_db()
+    assert job.status == Job.Status.FAILED
+    assert job.attempts == 2
+    assert claim_job() is None
+
+
+def test_expired_lease_is_claimed_again():
+    job = delete_files.enqueue({'names': []})
+    stale = claim_job()
+    assert stale.id == job.id
+    assert claim_job() is None
+    Job.objects.filter(id=job.id).update(
+        run_after=timezone.now() - timedelta(seconds=1)
+    )
+    fresh = claim_job()
+    assert fresh.attempts == 2
+    run_job(fresh)
+    stale.file.name = 'jobs/stale.txt'
+    run_job(stale)
+    job.refresh_from_db()
+    assert job.status == Job.Status.DONE
+    assert job.attempts == 2
+    assert not job.file
+
+
+def test_recipe_files_are_deleted_in_background(user_client, own_recipe):
+    name = default_storage.save('recipe_images/old.png', ContentFile(b'x'))
+    own_recipe.image = name
+    own_recipe.save()
+    response = user_client.delete(f'/api/recipes/{own_recipe.id}/')
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert default_storage.exists(name)
+    job = Job.objects.get(name='recipes.tasks.delete_files')
+    assert job.payload == {'names': [name]}
+    call_command('run_jobs', '--once')
+    assert not default_storage.exists(name)
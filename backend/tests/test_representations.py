@@ -0,0 +1,118 @@
+"""
+Быстрое представление рецептов и авторов: совпадение с сериализаторами
+DRF и микробенчмарк на 100 рецептах.
+"""
+import json
+import time
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from api.representations import (AUTHOR_FIELDS, RECIPE_FIELDS,
+                                 represent_authors, represent_recipes)
+from api.serializers import AuthorSerializer, RecipeReadSerializer
+from api.views import RecipeViewSet, UserViewSet
+from recipes.models import Recipe
+from users.models import User
+
+from .conftest import ROUNDS
+
+pytestmark = pytest.mark.django_db
+
+BENCHMARK_RECIPES = 100
+
+
+def make_request(user, path='/api/recipes/'):
+    request = RequestFactory().get(path)
+    request.user = user
+    return request
+
+
+def make_view(view_class, request, action):
+    view = view_class()
+    view.request = request
+    view.action = action
+    return view
+
+
+def dump(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+def recipe_ids(count=BENCHMARK_RECIPES):
+    return list(Recipe.objects.values_list('id', flat=True)[:count])
+
+
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_recipes_match_serializer(user, authenticated):
+    request = make_request(user if authenticated else AnonymousUser())
+    queryset = make_view(RecipeViewSet, request, 'list').get_queryset()
+    queryset = queryset.filter(id__in=recipe_ids())
+    expected = RecipeReadSerializer(
+        queryset.prefetch_related('tags', 'recipe_ingredients__ingredient'),
+        many=True,
+        context={'request': request}
+    ).data
+    assert dump(
+        represent_recipes(list(queryset.values(*RECIPE_FIELDS)), request)
+    ) == dump(expected)
+
+
+@pytest.mark.parametrize('path', (
+    '/api/users/subscriptions/',
+    '/api/users/subscriptions/?recipes_limit=2',
+))
+def test_authors_match_serializer(user, path):
+    request = make_request(user, path)
+    request.query_params = request.GET
+    view = make_view(UserViewSet, request, 'get_subscriptions')
+    authors = User.objects.filter(subscribed_by__user=user)
+    expected = AuthorSerializer(
+        view.get_authors_queryset(authors),
+        many=True,
+        context={'request': request}
+    ).data
+    assert dump(represent_authors(
+        list(authors.values(*AUTHOR_FIELDS)),
+        view.get_limited_recipes(),
+        request
+    )) == dump(expected)
+
+
+def test_recipes_representation_speedup(user, benchmark_report):
+    """Пишет в отчет время выдачи 100 рецептов обоими путями."""
+    request = make_request(user)
+    queryset = make_view(RecipeViewSet, request, 'list').get_queryset()
+    queryset = queryset.filter(id__in=recipe_ids())
+
+    def serializer():
+        return RecipeReadSerializer(
+            queryset.prefetch_related(
+                'tags', 'recipe_ingredients__ingredient'
+            ),
+            many=True,
+            context={'request': request}
+        ).data
+
+    def fast():
+        return represent_recipes(
+            list(queryset.values(*RECIPE_FIELDS)), request
+        )
+
+    medians = {}
+    for name, build in (('serializer', serializer), ('fast', fast)):
+        samples = []
+        for _ in range(ROUNDS):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                build()
+                samples.append((time.perf_counter() - started) * 1000)
+        queries = len(context.captured_queries)
+        benchmark_report[f'represent-100-recipes-{name}'] = {
+            'max_queries': queries, 'queries': queries, 'samples': samples
+        }
+        medians[name] = sorted(samples)[len(samples) // 2]
+    assert medians['fast'] < medians['serializer'], medians
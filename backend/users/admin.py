@@ -5,6 +5,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.templatetags.static import static
 from django.utils.html import format_html
 
+from core.paginators import EstimatedCountPaginator
 from recipes.models import Favorite, ShoppingCart
 
 from .models import Subscription, User
@@ -82,6 +83,8 @@ class UserAdmin(BaseUserAdmin):
     )
     inlines = (SubscriptionInline, FavoriteInline, ShoppingCartInline)
     ordering = ('username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     @display(description='Аватар')
     def avatar_preview(self, obj):
@@ -98,21 +101,11 @@ class UserAdmin(BaseUserAdmin):
             url
         )
 
-    @display(description='Подписок')
-    def subscriptions_count(self, obj):
-        return obj.subscriptions.count()
-
-    @display(description='Подписчиков')
-    def subscribers_count(self, obj):
-        return obj.subscribed_by.count()
-
-    @display(description='Избранных рецептов')
-    def favorite_recipes_count(self, obj):
-        return obj.favorite_recipes.count()
-
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('user', 'author')
     search_fields = ('user__username', 'author__username')
     ordering = ('user__username', 'author__username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
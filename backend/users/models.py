@@ -4,15 +4,22 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
 
+from core.db import delete_rows, insert_rows
+from recipes.counters import CountersMixin, change_counters
+from recipes.feed import backfill_author, remove_author
 from recipes.utils import make_relation_name
 
 from .constants import (OBJECT_NAME_MAX_DISPLAY_LENGTH, USER_EMAIL_MAX_LENGTH,
                         USER_NAME_MAX_LENGTH)
 
 
-class User(AbstractUser):
+class User(CountersMixin, AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
+    counter_fields = (
+        'recipes_count', 'favorite_recipes_count', 'subscriptions_count',
+        'subscribers_count'
+    )
 
     email = models.EmailField(
         verbose_name='Email',
@@ -39,6 +46,27 @@ class User(AbstractUser):
         blank=True,
         default=''
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False
+    )
+    favorite_recipes_count = models.PositiveIntegerField(
+        verbose_name='Избранных рецептов',
+        default=0,
+        editable=False
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        verbose_name='Подписок',
+        default=0,
+        editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Объект "Пользователь"'
@@ -59,13 +87,15 @@ class Subscription(models.Model):
         User,
         verbose_name='Пользователь',
         on_delete=models.CASCADE,
-        related_name='subscriptions'
+        related_name='subscriptions',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
         on_delete=models.CASCADE,
-        related_name='subscribed_by'
+        related_name='subscribed_by',
+        db_index=False
     )
 
     class Meta:
@@ -81,8 +111,47 @@ class Subscription(models.Model):
                 name='chk_users_subscriptions_prevent_self_subscription'
             )
         )
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='subscription_author_user_idx'
+            ),
+        )
         ordering = ('user__username', 'author__username')
         db_table = 'users_subscriptions'
 
     def __str__(self):
         return make_relation_name(self.user, self.author)
+
+    @classmethod
+    def subscribe(cls, user, author):
+        """
+        Подписывает пользователя на автора одним INSERT и дозаполняет
+        ленту рецептами автора.
+
+        Повтор пропускает ON CONFLICT DO NOTHING, нарушения других
+        ограничений не маскируются. Возвращает False, если подписка
+        уже есть.
+        """
+        if not insert_rows(
+            cls, [{'user_id': user.id, 'author_id': author.id}], 'author_id'
+        ):
+            return False
+        change_counters(User, (user.id,), 1, 'subscriptions_count')
+        change_counters(User, (author.id,), 1, 'subscribers_count')
+        backfill_author(user.id, author.id)
+        return True
+
+    @classmethod
+    def unsubscribe(cls, user, author_id):
+        """
+        Удаляет подписку одним DELETE и убирает рецепты автора из ленты.
+
+        Возвращает False, если подписки не было.
+        """
+        if not delete_rows(cls.objects.filter(user=user, author_id=author_id)):
+            return False
+        remove_author(user.id, author_id)
+        change_counters(User, (user.id,), -1, 'subscriptions_count')
+        change_counters(User, (author_id,), -1, 'subscribers_count')
+        return True
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.counters import change_counters
+from recipes.feed import backfill_author, remove_author
+
+from .models import Subscription, User
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        change_counters(User, (instance.user_id,), 1, 'subscriptions_count')
+        change_counters(User, (instance.author_id,), 1, 'subscribers_count')
+        backfill_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    change_counters(User, (instance.user_id,), -1, 'subscriptions_count')
+    change_counters(User, (instance.author_id,), -1, 'subscribers_count')
+    remove_author(instance.user_id, instance.author_id)